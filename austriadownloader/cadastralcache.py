@@ -0,0 +1,141 @@
+"""
+Module for mirroring the national cadastral GeoPackages to a local cache.
+
+Querying the remote BEV GeoPackages issues several HTTP range requests per tile. This module downloads
+every distinct cadastral GeoPackage once into a cache directory, verifies it against the remote size and
+ETag, and optionally extracts the parcels of the requested tile extents into a small local GeoPackage.
+"""
+import hashlib
+import json
+import shutil
+import urllib.parse
+import urllib.request
+import warnings
+from pathlib import Path
+from typing import Final, Dict, Any, Sequence, Tuple
+
+import geopandas as gpd
+import shapely
+
+from austriadownloader.scheduler import bulk_request, request
+
+# Constants
+CADASTRAL_LAYER: Final[str] = "NFL"
+CHUNK_SIZE: Final[int] = 8 * 1024 * 1024  # bytes per streamed download chunk
+REQUEST_TIMEOUT: Final[int] = 60  # seconds
+
+
+def is_remote(url: str) -> bool:
+    """Check whether the url points to an HTTP(S) resource instead of a local file."""
+    return urllib.parse.urlparse(str(url)).scheme in ("http", "https")
+
+
+def remote_info(url: str) -> Dict[str, Any]:
+    """Get the size and ETag of a remote file from a HEAD request."""
+    def head() -> Dict[str, Any]:
+        with urllib.request.urlopen(urllib.request.Request(url, method="HEAD"), timeout=REQUEST_TIMEOUT) as response:
+            size = response.headers.get("Content-Length")
+            return {"size": int(size) if size is not None else None, "etag": response.headers.get("ETag")}
+
+    return request(url, head)
+
+
+def mirror_cadastral(url: str, cache_dir: Path | str, verbose: bool = False) -> Path:
+    """
+    Get a verified local copy of a cadastral GeoPackage, downloading it on a cache miss.
+
+    The remote size and ETag are stored next to the copy and compared on later calls. If the server cannot
+    be reached, an existing copy is used as is.
+
+    Args:
+        url: Remote or local path of the cadastral GeoPackage.
+        cache_dir: Directory holding the local copies.
+        verbose: Print download progress.
+
+    Returns:
+        Path: Path of the local GeoPackage, or the input path itself if it is already local.
+
+    Raises:
+        IOError: If the file can neither be downloaded nor found in the cache.
+    """
+    if not is_remote(url):
+        return Path(url)
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    local_path = cache_dir / Path(urllib.parse.urlparse(url).path).name
+    info_path = local_path.with_suffix(".json")
+
+    try:
+        info = remote_info(url)
+    except OSError as e:
+        if local_path.exists():
+            warnings.warn(f"Could not verify {url}, using cached copy: {e}", UserWarning)
+            return local_path
+        raise IOError(f"Failed to access cadastral data {url}: {e}") from e
+
+    if local_path.exists() and info_path.exists():
+        cached = json.loads(info_path.read_text())
+        if cached == info and (info["size"] is None or local_path.stat().st_size == info["size"]):
+            return local_path
+
+    if verbose:
+        print(f"Downloading cadastral data: {url}")
+
+    # stream into a partial file, so interrupted downloads are never mistaken for complete ones
+    part_path = local_path.with_suffix(local_path.suffix + ".part")
+
+    def download() -> None:
+        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response, open(part_path, "wb") as f:
+            shutil.copyfileobj(response, f, length=CHUNK_SIZE)
+
+    try:
+        bulk_request(url, download)
+    except OSError as e:
+        part_path.unlink(missing_ok=True)
+        raise IOError(f"Failed to download cadastral data {url}: {e}") from e
+
+    if info["size"] is not None and part_path.stat().st_size != info["size"]:
+        part_path.unlink(missing_ok=True)
+        raise IOError(f"Incomplete download of {url}: expected {info['size']} bytes")
+
+    part_path.replace(local_path)
+    info_path.write_text(json.dumps(info))
+    return local_path
+
+
+def extract_cadastral(
+        path: Path | str,
+        extents: Sequence[Tuple[float, float, float, float]],
+        cache_dir: Path | str
+) -> Path:
+    """
+    Extract the cadastral parcels intersecting the given extents into a small local GeoPackage.
+
+    Only the geometry and the NS land use code are kept. Extracts are named by a hash of the extents, so
+    repeated runs over the same tiles reuse them.
+
+    Args:
+        path: Local path of the cadastral GeoPackage.
+        extents: Bounding boxes (minx, miny, maxx, maxy) in the CRS of the GeoPackage.
+        cache_dir: Directory holding the extracts.
+
+    Returns:
+        Path: Path of the extracted GeoPackage.
+    """
+    path = Path(path)
+    digest = hashlib.sha1(json.dumps([path.name, *sorted(map(list, extents))]).encode()).hexdigest()[:16]
+    extract_path = Path(cache_dir) / f"{path.stem}_extract_{digest}.gpkg"
+    if extract_path.exists():
+        return extract_path
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    mask = shapely.union_all(shapely.box(*zip(*extents)))
+    parcels = gpd.read_file(path, layer=CADASTRAL_LAYER, columns=["NS"], mask=mask, fid_as_index=True)
+    parcels = parcels.sort_index().reset_index(drop=True)  # keep the feature order of the source
+
+    # write to a partial file first, so an interrupted extraction is not reused
+    part_path = extract_path.with_suffix(".part.gpkg")
+    parcels.to_file(part_path, driver="GPKG", layer=CADASTRAL_LAYER)
+    part_path.replace(extract_path)
+    return extract_path
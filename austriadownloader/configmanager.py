@@ -1,3 +1,4 @@
+import hashlib
 import json
 import yaml
 
@@ -5,6 +6,8 @@ from pathlib import Path
 from typing import Literal, Final, TypeAlias, Dict, Any, List, Tuple
 from pydantic import BaseModel, field_validator, ValidationError, model_validator
 
+from austriadownloader.resampling import RESAMPLE_ENGINES, RESAMPLING_METHODS
+
 # Type aliases
 ChannelCount: TypeAlias = Literal[3, 4]  # RGB or RGBN
 ImageShape = tuple[ChannelCount, int, int]
@@ -12,7 +15,51 @@ ImageShape = tuple[ChannelCount, int, int]
 # Valid constants
 VALID_PIXEL_SIZES: Final = (0.2, 0.4, 0.8, 1.6, 3.2, 6.4, 12.8, 25.6, 51.2, 102.4, 204.8)
 VALID_MASK_LABELS: Final = (40, 41, 42, 48, 52, 53, 54, 55, 56, 57, 58, 59, 60, 61, 62, 63, 64, 65, 72, 83, 84, 87, 88, 92, 95, 96)
-VALID_DOWNLOADS_METHODS: Final = ('sequential', 'parallel')
+VALID_DOWNLOADS_METHODS: Final = ('sequential', 'parallel', 'concurrent', 'pipeline')
+
+# Fields that change how a download runs but not its results, ignored by the config hash
+RUNTIME_CONFIG_FIELDS: Final = ('verbose', 'download_method', 'gdal_profile', 'gdal_options', 'cadastral_cache',
+                                'cadastral_extract', 'vector_batch', 'resume', 'io_workers', 'cpu_workers',
+                                'pipeline_workers', 'pipeline_queue_size', 'max_retries', 'retry_backoff',
+                                'host_concurrency', 'profile_workers')
+
+# Default worker threads per stage of the pipeline download method
+PIPELINE_WORKERS: Final[Dict[str, int]] = {'vector': 4, 'raster': 8, 'compute': 2, 'write': 2}
+
+# GDAL/HTTP environment presets for remote reads, from fewest to most resources used
+GDAL_ENV_PRESETS: Final[Dict[str, Dict[str, Any]]] = {
+    'gdal': {},  # plain GDAL defaults
+    'low_memory': {
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif,.gpkg',
+        'GDAL_HTTP_MULTIPLEX': 'YES',
+        'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+        'GDAL_HTTP_VERSION': '2',
+        'VSI_CACHE': 'TRUE',
+        'VSI_CACHE_SIZE': 5_000_000,  # bytes per file
+        'GDAL_CACHEMAX': 64,  # MB
+    },
+    'default': {
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif,.gpkg',
+        'GDAL_HTTP_MULTIPLEX': 'YES',
+        'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+        'GDAL_HTTP_VERSION': '2',
+        'VSI_CACHE': 'TRUE',
+        'VSI_CACHE_SIZE': 25_000_000,
+        'GDAL_CACHEMAX': 256,
+    },
+    'throughput': {
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif,.gpkg',
+        'GDAL_HTTP_MULTIPLEX': 'YES',
+        'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+        'GDAL_HTTP_VERSION': '2',
+        'VSI_CACHE': 'TRUE',
+        'VSI_CACHE_SIZE': 200_000_000,
+        'GDAL_CACHEMAX': 1024,
+    },
+}
 
 
 class ConfigManager(BaseModel):
@@ -24,12 +71,29 @@ class ConfigManager(BaseModel):
 
     outfile_prefixes: Dict[str, str] = {"raster": "input", "vector": "target"}
     resample_size: float | int | None = None
+    resample_engine: str = 'pil'
+    resampling: str = 'lanczos'  # GDAL resampling method, 'gdal' resample_engine only
     download_method: str = 'sequential'
     create_gpkg: bool = False
     verbose: bool = False
     nodata_mode: str = 'flag'
     nodata_value: int = 0
     mask_remapping: Dict[int, Any] | None = None  # mapping FROM - TO
+    gdal_profile: str = 'default'
+    gdal_options: Dict[str, Any] | None = None  # overrides of the gdal_profile options
+    cadastral_cache: Path | str | None = None  # local mirror directory of the cadastral GeoPackages
+    cadastral_extract: bool = False
+    vector_batch: bool = False
+    extended_stats: bool = False
+    resume: bool = True
+    io_workers: int | None = None  # threads reading remote data, concurrent download method only, defaults to host_concurrency
+    cpu_workers: int | None = None  # worker processes, defaults to the CPU count
+    pipeline_workers: Dict[str, int] | None = None  # overrides of PIPELINE_WORKERS
+    pipeline_queue_size: int = 32
+    max_retries: int = 5  # retries of remote requests failing with a transient error
+    retry_backoff: float = 0.5  # base delay of the exponential backoff in seconds
+    host_concurrency: int = 16  # upper bound of the adaptive concurrent requests per host, split among worker processes
+    profile_workers: bool = False
 
     class Config:
         frozen = True  # Make instances immutable
@@ -39,6 +103,40 @@ class ConfigManager(BaseModel):
         """Return all fields as a dict including defaults and validated data."""
         return self.model_dump()
 
+    @property
+    def config_hash(self) -> str:
+        """
+        Return a hash of all fields affecting the downloaded data, identifying resumable runs.
+
+        The outpath is left out, as the journal of completed tiles lives inside it, and the data_path is
+        resolved, so a run resumes regardless of how its paths are spelled.
+        """
+        relevant = {k: v for k, v in self.config_data.items() if k not in RUNTIME_CONFIG_FIELDS and k != 'outpath'}
+        relevant['data_path'] = Path(self.data_path).resolve()
+        return hashlib.sha1(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    @property
+    def source_pixel_size(self) -> float:
+        """
+        Return the pixel size of the overview raster windows are read from.
+
+        If GDAL resamples while reading, this is the coarsest overview not exceeding resample_size, which keeps
+        the transferred bytes close to the output size. Otherwise, windows are read at pixel_size.
+        """
+        if self.resample_size is not None and self.resample_engine == 'gdal':
+            return max(size for size in VALID_PIXEL_SIZES if size <= self.resample_size)
+        return self.pixel_size
+
+    @property
+    def stage_workers(self) -> Dict[str, int]:
+        """Return the worker threads per stage of the pipeline download method including overrides."""
+        return {**PIPELINE_WORKERS, **(self.pipeline_workers or {})}
+
+    @property
+    def gdal_env(self) -> Dict[str, Any]:
+        """Return the GDAL configuration options of the selected profile including overrides."""
+        return {**GDAL_ENV_PRESETS[self.gdal_profile], **(self.gdal_options or {})}
+
     @field_validator("outfile_prefixes")
     @classmethod
     def validate_outfile_prefixes(cls, value: Dict[str, str]) -> Dict[str, str]:
@@ -67,6 +165,20 @@ class ConfigManager(BaseModel):
         else:
             raise ValueError("Provide as float, int or None - null in rgb.yml")
 
+    @field_validator("resample_engine")
+    @classmethod
+    def validate_resample_engine(cls, value: str) -> str:
+        if value not in RESAMPLE_ENGINES:
+            raise ValueError(f"Invalid resampling engine: {value}. Must be one of {RESAMPLE_ENGINES}")
+        return value
+
+    @field_validator("resampling")
+    @classmethod
+    def validate_resampling(cls, value: str) -> str:
+        if value not in RESAMPLING_METHODS:
+            raise ValueError(f"Invalid resampling method: {value}. Must be one of {RESAMPLING_METHODS}")
+        return value
+
     @field_validator("shape")
     @classmethod
     def validate_shape(cls, value: ImageShape) -> ImageShape:
@@ -86,6 +198,21 @@ class ConfigManager(BaseModel):
             raise ValueError(f"Output path is invalid: {path}")
         return path
 
+    @field_validator("cadastral_cache")
+    @classmethod
+    def validate_cadastral_cache(cls, value: Path | str | None) -> Path | None:
+        if value is None:
+            return value
+        path = Path(value)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    @model_validator(mode="after")
+    def check_cadastral_extract(self):
+        if self.cadastral_extract and self.cadastral_cache is None:
+            raise ValueError("cadastral_extract requires a cadastral_cache directory")
+        return self
+
     @field_validator("data_path")
     @classmethod
     def validate_data_path(cls, value: Path | str) -> Path:
@@ -133,6 +260,51 @@ class ConfigManager(BaseModel):
 
         return new
 
+    @field_validator("gdal_profile")
+    @classmethod
+    def validate_gdal_profile(cls, value: str) -> str:
+        if value not in GDAL_ENV_PRESETS:
+            raise ValueError(f"Invalid GDAL profile: {value}. Must be one of {tuple(GDAL_ENV_PRESETS)}")
+        return value
+
+    @field_validator("gdal_options")
+    @classmethod
+    def validate_gdal_options(cls, value: Dict[str, Any] | None) -> Dict[str, Any] | None:
+        if value is not None and not all(isinstance(k, str) and k.isupper() for k in value):
+            raise ValueError(f"Invalid GDAL options: {value}. Keys must be GDAL configuration option names.")
+        return value
+
+    @field_validator("io_workers", "cpu_workers")
+    @classmethod
+    def validate_workers(cls, value: int | None) -> int | None:
+        if value is not None and value < 1:
+            raise ValueError(f"Invalid worker count: {value}. Must be at least 1.")
+        return value
+
+    @field_validator("pipeline_workers")
+    @classmethod
+    def validate_pipeline_workers(cls, value: Dict[str, int] | None) -> Dict[str, int] | None:
+        if value is None:
+            return value
+        if not all(k in PIPELINE_WORKERS for k in value) or not all(v >= 1 for v in value.values()):
+            raise ValueError(f"Invalid pipeline workers: {value}. Keys must be within {tuple(PIPELINE_WORKERS)} "
+                             f"and counts at least 1.")
+        return value
+
+    @field_validator("pipeline_queue_size", "host_concurrency")
+    @classmethod
+    def validate_positive_count(cls, value: int) -> int:
+        if value < 1:
+            raise ValueError(f"Invalid value: {value}. Must be at least 1.")
+        return value
+
+    @field_validator("max_retries", "retry_backoff")
+    @classmethod
+    def validate_retries(cls, value: int | float) -> int | float:
+        if value < 0:
+            raise ValueError(f"Invalid retry setting: {value}. Must not be negative.")
+        return value
+
     @field_validator("download_method")
     @classmethod
     def validate_download_method(cls, value: str) -> str:
@@ -145,13 +317,21 @@ class ConfigManager(BaseModel):
         if self.resample_size is not None:
             if self.resample_size <= self.pixel_size:
                 raise ValueError(f"resample_size {self.resample_size} must be larger than pixel_size {self.pixel_size}")
-            elif self.resample_size >= VALID_PIXEL_SIZES[VALID_PIXEL_SIZES.index(self.pixel_size)+1]:
+            elif self.resample_engine != 'gdal' and self.resample_size >= VALID_PIXEL_SIZES[VALID_PIXEL_SIZES.index(self.pixel_size)+1]:
+                # only GDAL reads from coarser overviews, see source_pixel_size
                 raise ValueError(f"resample_size {self.resample_size} must be smaller than next largest available pixel size: {VALID_PIXEL_SIZES[VALID_PIXEL_SIZES.index(self.pixel_size)+1]}")
             else:
                 return self
         else:
             return self
 
+    @model_validator(mode="after")
+    def check_resampling(self):
+        if self.resampling != 'lanczos' and self.resample_engine != 'gdal':
+            raise ValueError(f"resampling {self.resampling} requires resample_engine 'gdal', "
+                             f"the {self.resample_engine} engine only supports 'lanczos'")
+        return self
+
     @classmethod
     def from_config_file(cls, file_path: str | Path) -> "ConfigManager":
         path = Path(file_path)
@@ -169,6 +349,8 @@ class ConfigManager(BaseModel):
         # Ensure all parameters are loaded, using defaults if necessary
         default_values = {
             "resample_size": None,
+            "resample_engine": "pil",
+            "resampling": "lanczos",
             "create_gpkg": False,
             "nodata_mode": "flag",
             "verbose": False,
@@ -176,6 +358,21 @@ class ConfigManager(BaseModel):
             "download_method": "sequential",
             "outfile_prefixes": {"raster": "input", "vector": "target"},
             "mask_remapping": None,
+            "gdal_profile": "default",
+            "gdal_options": None,
+            "cadastral_cache": None,
+            "cadastral_extract": False,
+            "vector_batch": False,
+            "extended_stats": False,
+            "resume": True,
+            "io_workers": None,
+            "cpu_workers": None,
+            "pipeline_workers": None,
+            "pipeline_queue_size": 32,
+            "max_retries": 5,
+            "retry_backoff": 0.5,
+            "host_concurrency": 16,
+            "profile_workers": False,
         }
         config_data = {**default_values, **config_data}  # Merge defaults with provided values
 
@@ -4,16 +4,55 @@ Module for loading and managing Austrian cadastral geospatial data.
 This module provides functionality to load Austrian cadastral boundaries from
 shapefiles stored within the package resources. It implements lazy loading
 to optimize memory usage and startup time.
+
+The footprint table is loaded on first use of get_cadastral_data (or AUSTRIA_CADASTRAL), not on import.
+Parsing the GeoPackage is replaced by a binary cache next to it, holding WKB geometries and plain NumPy
+columns, which is rebuilt whenever the GeoPackage changes. Worker processes forked after the first use
+inherit the loaded table, spawned workers load it from the binary cache.
 """
 
+import os
+import tempfile
+import threading
 from pathlib import Path
-from typing import Final
+from typing import Final, Tuple, List, Any
 import geopandas as gpd
 import importlib.resources
+import numpy as np
+import pandas as pd
+import shapely
 
 # Constants
 RESOURCE_PACKAGE: Final[str] = "austriadownloader.austria_data"
 CADASTRAL_FILENAME: Final[str] = "matched_metadata.gpkg"
+CACHE_FILENAME: Final[str] = "matched_metadata.npz"
+CACHE_VERSION: Final[int] = 1
+
+# Loaded footprint table of this process, see get_cadastral_data
+_CADASTRAL: gpd.GeoDataFrame | None = None
+_CADASTRAL_LOCK: Final[threading.Lock] = threading.Lock()
+
+
+def get_cadastral_data() -> gpd.GeoDataFrame:
+    """
+    Get the Austrian cadastral footprint table, loading it on first use.
+
+    Returns:
+        gpd.GeoDataFrame: Spatial data containing Austrian cadastral boundaries, shared by all callers.
+    """
+    global _CADASTRAL
+    if _CADASTRAL is None:
+        with _CADASTRAL_LOCK:
+            if _CADASTRAL is None:
+                _CADASTRAL = load_cadastral_data()
+    return _CADASTRAL
+
+
+def __getattr__(name: str) -> Any:
+    # AUSTRIA_CADASTRAL is resolved lazily, so importing the package does not load the table
+    if name == "AUSTRIA_CADASTRAL":
+        return get_cadastral_data()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def load_cadastral_data() -> gpd.GeoDataFrame:
@@ -22,7 +61,8 @@ def load_cadastral_data() -> gpd.GeoDataFrame:
 
     This function loads cadastral boundaries from a shapefile stored in the package
     resources. It includes error handling for common file access issues and
-    validates the data source existence.
+    validates the data source existence. The binary cache is used if it matches the
+    shapefile and is rebuilt otherwise.
 
     Returns:
         gpd.GeoDataFrame: Spatial data containing Austrian cadastral boundaries.
@@ -35,24 +75,106 @@ def load_cadastral_data() -> gpd.GeoDataFrame:
     try:
         with importlib.resources.path(RESOURCE_PACKAGE, CADASTRAL_FILENAME) as resource_path:
             geopackage_path = Path(resource_path).resolve()
-            
+
             if not geopackage_path.exists():
                 raise FileNotFoundError(
                     f"Cadastral geopackage not found at: {geopackage_path}"
                 )
-            
+
+            key = source_key(geopackage_path)
+            for cache_path in cache_paths(geopackage_path):
+                cadastral_data = read_cache(cache_path, key)
+                if cadastral_data is not None:
+                    return cadastral_data
+
             cadastral_data = gpd.read_file(geopackage_path)
-            
+
             if cadastral_data.empty:
                 raise ValueError("Loaded cadastral data is empty")
-                
+
+            for cache_path in cache_paths(geopackage_path):
+                try:
+                    write_cache(cadastral_data, cache_path, key)
+                    break
+                except OSError:
+                    # e.g. a read-only installation, try the next location
+                    continue
+
             return cadastral_data
-            
+
     except (FileNotFoundError, ValueError) as e:
         raise e
     except Exception as e:
         raise IOError(f"Failed to load cadastral data: {str(e)}") from e
 
-# Lazy-loaded cadastral data
-# This will only be loaded when first accessed
-AUSTRIA_CADASTRAL: Final[gpd.GeoDataFrame] = load_cadastral_data()
+
+def source_key(path: Path) -> Tuple[int, int, int]:
+    """Identify the state of a source file by the cache version, its modification time and size."""
+    stat = path.stat()
+    return CACHE_VERSION, stat.st_mtime_ns, stat.st_size
+
+
+def cache_paths(geopackage_path: Path) -> List[Path]:
+    """Candidate locations of the binary cache: next to the GeoPackage, else in the temporary directory."""
+    return [geopackage_path.with_name(CACHE_FILENAME), Path(tempfile.gettempdir()) / "austriadownloader" / CACHE_FILENAME]
+
+
+def write_cache(data: gpd.GeoDataFrame, path: Path, key: Tuple[int, ...]) -> None:
+    """
+    Write a GeoDataFrame as binary cache: WKB geometries in one buffer and every column as a NumPy array.
+
+    The cache is written to a temporary file and moved into place, so concurrent readers never see a partial file.
+    """
+    columns = [c for c in data.columns if c != data.geometry.name]
+    wkb = shapely.to_wkb(data.geometry.to_numpy())
+    arrays = {
+        'key': np.asarray(key, dtype=np.int64),
+        'crs': np.asarray(data.crs.to_wkt()),
+        'geometry_name': np.asarray(data.geometry.name),
+        'columns': np.asarray(columns, dtype=str),
+        'dtypes': np.asarray([str(data[c].dtype) for c in columns], dtype=str),
+        'wkb': np.frombuffer(b''.join(wkb), dtype=np.uint8),
+        'wkb_offsets': np.cumsum([0, *(len(g) for g in wkb)], dtype=np.int64),
+    }
+    for i, column in enumerate(columns):
+        values = data[column]
+        if values.dtype.kind in 'biufmM':
+            arrays[f'column_{i}'] = values.to_numpy()
+        else:
+            arrays[f'column_{i}'] = values.to_numpy(dtype=str)
+            arrays[f'null_{i}'] = values.isna().to_numpy()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def read_cache(path: Path, key: Tuple[int, ...]) -> gpd.GeoDataFrame | None:
+    """Read a GeoDataFrame from its binary cache, None if there is no cache or it does not match the key."""
+    try:
+        with np.load(path, allow_pickle=False) as cache:
+            if cache['key'].tolist() != list(key):
+                return None
+
+            offsets = cache['wkb_offsets']
+            buffer = cache['wkb'].tobytes()
+            geometry = shapely.from_wkb([buffer[start:end] for start, end in zip(offsets[:-1], offsets[1:])])
+
+            columns = {}
+            for i, (column, dtype) in enumerate(zip(cache['columns'].tolist(), cache['dtypes'].tolist())):
+                values = cache[f'column_{i}']
+                if f'null_{i}' in cache.files:
+                    values = values.astype(object)
+                    values[cache[f'null_{i}']] = None
+                columns[column] = pd.Series(values).astype(dtype)
+
+            return gpd.GeoDataFrame(columns, geometry=gpd.GeoSeries(geometry, name=str(cache['geometry_name'])),
+                                    crs=str(cache['crs']))
+    except Exception:
+        # missing, corrupt (e.g. zipfile.BadZipFile) or outdated cache, rebuilt by the caller
+        return None
@@ -8,27 +8,36 @@ RGBN raster data, vector data processing, and rasterization operations.
 The module supports various pixel sizes through overview levels and ensures proper
 coordinate transformations between different coordinate reference systems (CRS).
 """
-import fiona
+import importlib.util
 import geopandas as gpd
 import numpy as np
+import os
+import pyogrio
 import pandas as pd
 import rasterio as rio
+import threading
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
-from typing import Final, TypeAlias, Literal, Dict, Tuple, Optional
+from typing import Final, TypeAlias, Literal, Dict, Tuple, Optional, Any, Iterator, List, NamedTuple
 
 import rasterio.transform
 import shapely
 from pyproj import Transformer
 from rasterio.features import rasterize
+from rasterio.enums import Resampling
 from rasterio.windows import Window
-from shapely.geometry import Point, shape
-from PIL import Image
+from shapely.geometry import Point
 
-from austriadownloader.data import AUSTRIA_CADASTRAL
+from austriadownloader.cadastralcache import CADASTRAL_LAYER
+from austriadownloader.resampling import resample
+from austriadownloader.scheduler import bulk_request, request
+from austriadownloader.data import get_cadastral_data
 from austriadownloader.configmanager import ConfigManager
-from austriadownloader.downloadmanager import DownloadState
+from austriadownloader.downloadstate import DownloadState
 
 # Type aliases for improved readability
 Coordinates: TypeAlias = Tuple[float, float]
@@ -54,6 +63,99 @@ VALID_OVERVIEWS: Final[Dict[float, OverviewLevel]] = {
 WGS84: Final[str] = "EPSG:4326"
 AUSTRIA_CRS: Final[str] = "EPSG:31287"
 
+# Arrow based vector reads are used when the optional pyarrow dependency is installed
+USE_ARROW: Final[bool] = importlib.util.find_spec("pyarrow") is not None
+
+
+
+class RasterTile(NamedTuple):
+    """In-memory description of a written raster tile, handed from the raster to the vector stage."""
+    crs: rio.crs.CRS
+    transform: rio.Affine
+    height: int
+    width: int
+
+    @property
+    def bounds(self) -> BoundingBox:
+        """Bounds (minx, miny, maxx, maxy) of the tile in its CRS."""
+        return rio.transform.array_bounds(self.height, self.width, self.transform)
+
+
+class RasterWindow(NamedTuple):
+    """Raw window data of a tile as read from the mosaics, before padding and resampling."""
+    data: np.ndarray
+    profile: Dict
+    window: Window
+    src_transform: rio.Affine
+
+
+class RasterProduct(NamedTuple):
+    """Padded and resampled raster data of a tile, ready to be encoded."""
+    data: np.ndarray
+    profile: Dict
+    transform: rio.Affine
+
+
+class MaskProduct(NamedTuple):
+    """Rasterized mask of a tile and its parcels in the raster CRS, ready to be encoded."""
+    mask: np.ndarray
+    parcels: gpd.GeoDataFrame | None
+
+
+class TileFetch(NamedTuple):
+    """Remote data of a tile, handed from the I/O-bound to the CPU-bound part of the download."""
+    raster: RasterWindow
+    raster_tile: RasterTile
+    parcels: gpd.GeoDataFrame
+
+
+# Process-wide cache of Transformers keyed by (from_crs, to_crs)
+_TRANSFORMER_CACHE: Dict[Tuple[str, str], Transformer] = {}
+_TRANSFORMER_LOCK: Final[threading.Lock] = threading.Lock()
+
+# Maximum number of remote rasters kept open per worker
+RASTER_POOL_SIZE: Final[int] = 8
+
+
+class _RasterPool(threading.local):
+    """LRU pool of open datasets keyed by (url, overview_level), separate for every thread and process."""
+
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self.datasets: OrderedDict[Tuple[str, int], rio.DatasetReader] = OrderedDict()
+
+
+_RASTER_POOL: Final[_RasterPool] = _RasterPool()
+
+
+class _ParcelCache(threading.local):
+    """Parcels prefetched for the footprint group currently processed by a thread."""
+
+    def __init__(self) -> None:
+        self.vector_url: str | None = None
+        self.mask: shapely.Geometry | None = None
+        self.parcels: gpd.GeoDataFrame | None = None
+
+
+_PARCEL_CACHE: Final[_ParcelCache] = _ParcelCache()
+
+
+class _ReadBuffer(threading.local):
+    """Preallocated output arrays of window reads and resampling by slot, reused for every tile a thread downloads."""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, np.ndarray] = {}
+
+
+_READ_BUFFER: Final[_ReadBuffer] = _ReadBuffer()
+
+# Nesting depth and replaced options of the process-wide pyogrio configuration, see vector_env
+_VECTOR_ENV: Dict[str, Any] = {'depth': 0, 'previous': {}}
+_VECTOR_ENV_LOCK: Final[threading.Lock] = threading.Lock()
+
+# Thread pool for reads issued alongside the main read of a tile, created per process on first use
+_READ_EXECUTOR: Dict[int, ThreadPoolExecutor] = {}
+
 
 # BUILDING_CLASS: Final[int] = 92  # Building class code
 def download(tile_state: DownloadState, config: ConfigManager, verbose: bool) -> DownloadState:
@@ -72,62 +174,136 @@ def download(tile_state: DownloadState, config: ConfigManager, verbose: bool) ->
         ValueError: If the request contains invalid parameters.
         IOError: If there are issues with file operations.
     """
-    # using environment options is disabled for now
-    # with AustriaServerConfig().get_env("default"):
     try:
+        with rio.Env(**config.gdal_env), vector_env(config.gdal_env):
+            return _download(tile_state, config, verbose)
+
+    except Exception as e:
+        raise IOError(f"Failed to process data request: {str(e)}") from e
+
+
+def _download(tile_state: DownloadState, config: ConfigManager, verbose: bool) -> DownloadState:
+    """Download and process the data of a single tile, called within the configured GDAL environment."""
+    if verbose:
+        print(f'Tile: {tile_state.id}')
+
+    with tile_state.timed('metadata'):
+        meta_data = resolve_metadata(tile_state)
+
+    # Point has been sampeld out of queryable area of Austria
+    if meta_data is None:
+        tile_state.set_raster_failed()
+        tile_state.set_vector_failed()
+        return tile_state
+
+    # Download appropriate raster data based on channel count
+    if config.shape[0] == 3:
         if verbose:
-            print(f'Tile: {tile_state.id}')
+            print("    Downloading RGB raster data.")
+        raster_tile = download_rasterdata_rgb(tile_state, config, meta_data)
 
-        # Transform coordinates to planar CRS
-        point_planar = transform_coordinates(
-            (tile_state.lon, tile_state.lat),
-            from_crs=WGS84,
-            to_crs=AUSTRIA_CRS
-        )
-        point_geometry = Point(*point_planar)
+    elif config.shape[0] == 4:
+        if verbose:
+            print("    Downloading RGB and NIR raster data.")
+        raster_tile = download_rasterdata_rgbn(tile_state, config, meta_data)
+
+    else:
+        raise ValueError(f"    Invalid channel count: {config.shape[0]}. Must be 3 (RGB) or 4 (RGB and NIR).")
+
+    # Process vector data
+    if tile_state.check_raster():
+        if verbose:
+            print(f"    Downloading vector cadastral data: Code(s): {config.mask_label}")
+        download_vector(tile_state, config, meta_data, raster_tile)
+
+        if verbose:
+            print(f"    Finished downloading and processing data to: {config.outpath}/*/*_{tile_state.id}.tif")
+    else:
+        if verbose:
+            print(f'    Did not download raster and vector data as no raster was accessed. Likely due to NoData values and {config.nodata_mode} set as "remove"')
 
-        # Find intersecting meta data
-        meta_data = get_intersecting_cadastral(point_geometry)
+    return tile_state
 
-        # Point has been sampeld out of queryable area of Austria
+
+def resolve_metadata(tile_state: DownloadState) -> pd.Series | None:
+    """Get the footprint metadata of a tile, matched in bulk during planning or looked up by its point."""
+    if tile_state.meta_index is not None:
+        # Meta data has already been matched in bulk
+        return get_cadastral_by_index(tile_state.meta_index)
+
+    # Transform coordinates to planar CRS
+    point_planar = transform_coordinates(
+        (tile_state.lon, tile_state.lat),
+        from_crs=WGS84,
+        to_crs=AUSTRIA_CRS
+    )
+    point_geometry = Point(*point_planar)
+
+    # Find intersecting meta data
+    return get_intersecting_cadastral(point_geometry)
+
+
+def fetch_tile(tile_state: DownloadState, config: ConfigManager) -> Optional[TileFetch]:
+    """
+    Read the remote raster window and cadastral parcels of a tile, without processing them.
+
+    This is the I/O-bound part of download() and is run on threads by the concurrent download method.
+
+    Args:
+        tile_state: Class for keeping track of Download Processes
+        config: RConfigManager object.
+
+    Returns:
+        Optional[TileFetch]: The fetched data, None if the tile lies outside the queryable area.
+    """
+    with rio.Env(**config.gdal_env), vector_env(config.gdal_env):
+        with tile_state.timed('metadata'):
+            meta_data = resolve_metadata(tile_state)
         if meta_data is None:
             tile_state.set_raster_failed()
             tile_state.set_vector_failed()
-            return tile_state
+            return None
 
-        # Download appropriate raster data based on channel count
-        if config.shape[0] == 3:
-            if verbose:
-                print("    Downloading RGB raster data.")
-            download_rasterdata_rgb(tile_state, config, meta_data)
+        raster = read_rasterdata(tile_state, config, meta_data)
+        raster_tile = describe_raster_tile(raster.profile, raster.window, raster.src_transform, config)
+        with tile_state.timed('vector_query'):
+            parcels = read_vector_data(tile_state.vector_path or meta_data["vector_url"], config, raster_tile)
 
-        elif config.shape[0] == 4:
-            if verbose:
-                print("    Downloading RGB and NIR raster data.")
-            download_rasterdata_rgbn(tile_state, config, meta_data)
+    return TileFetch(raster=raster, raster_tile=raster_tile, parcels=parcels)
 
-        else:
-            raise ValueError(f"    Invalid channel count: {config.shape[0]}. Must be 3 (RGB) or 4 (RGB and NIR).")
 
-        # Process vector data
-        if tile_state.check_raster():
-            if verbose:
-                print(f"    Downloading vector cadastral data: Code(s): {config.mask_label}")
-            download_vector(tile_state, config, meta_data)
+def compute_tile(tile_state: DownloadState, config: ConfigManager, fetched: TileFetch) -> DownloadState:
+    """
+    Process and write the fetched data of a tile.
 
-            if verbose:
-                print(f"    Finished downloading and processing data to: {config.outpath}/*/*_{tile_state.id}.tif")
-        else:
-            if verbose:
-                print(f'    Did not download raster and vector data as no raster was accessed. Likely due to NoData values and {config.nodata_mode} set as "remove"')
+    This is the CPU-bound part of download() (padding, resampling, rasterization and encoding) and is run
+    in worker processes by the concurrent download method.
 
-        return tile_state
+    Args:
+        tile_state: Class for keeping track of Download Processes
+        config: RConfigManager object.
+        fetched: Data of the tile returned by fetch_tile.
 
-    except Exception as e:
-        raise IOError(f"Failed to process data request: {str(e)}") from e
+    Returns:
+        DownloadState: The updated tile state.
+    """
+    with rio.Env(**config.gdal_env):
+        raster_tile = process_raster_data(tile_state, config, *fetched.raster)
+        if raster_tile is None:
+            return tile_state
 
+        try:
+            rasterize_vector_data(fetched.parcels, config, tile_state, raster_tile)
+        except Exception:
+            tile_state.set_vector_failed()
+            raise
+        tile_state.set_vector_successful()
+
+    return tile_state
 
-def download_vector(tile_state: DownloadState, config: ConfigManager, vector_data: pd.Series) -> None:
+
+def download_vector(tile_state: DownloadState, config: ConfigManager, vector_data: pd.Series,
+                    raster_tile: RasterTile) -> None:
     """
     Download and process vector data for the specified location.
 
@@ -135,6 +311,7 @@ def download_vector(tile_state: DownloadState, config: ConfigManager, vector_dat
         tile_state: Class for keeping track of Download Processes
         config: RConfigManager object.
         vector_data: Metadata Series with download URL
+        raster_tile: Description of the raster tile the vector data is aligned to
 
     Returns:
         Path: Path to the processed vector data.
@@ -148,9 +325,10 @@ def download_vector(tile_state: DownloadState, config: ConfigManager, vector_dat
 
         # Process and save vector data
         process_vector_data(
-            vector_url=vector_data["vector_url"],
+            vector_url=tile_state.vector_path or vector_data["vector_url"],
             config=config,
-            tile_state=tile_state
+            tile_state=tile_state,
+            raster_tile=raster_tile
         )
 
         tile_state.set_vector_successful()
@@ -161,7 +339,7 @@ def download_vector(tile_state: DownloadState, config: ConfigManager, vector_dat
         raise IOError(f"Vector data processing failed: {str(e)}") from e
 
 
-def download_rasterdata_rgb(tile_state: DownloadState, config: ConfigManager, raster_data: pd.Series) -> pd.Series:
+def download_rasterdata_rgb(tile_state: DownloadState, config: ConfigManager, raster_data: pd.Series) -> Optional[RasterTile]:
     """
     Download and process RGB raster data.
 
@@ -171,36 +349,97 @@ def download_rasterdata_rgb(tile_state: DownloadState, config: ConfigManager, ra
         raster_data: Metadata Series with download URL
 
     Returns:
-        pd.Series: Metadata about the downloaded raster data.
+        Optional[RasterTile]: Description of the written raster tile, None if it was removed.
 
     Raises:
         ValueError: If the requested area is invalid.
         IOError: If raster processing fails.
     """
     try:
+        # experimental check? should be portable to both rgb and rgbnir
+        return process_raster_data(tile_state, config,
+                                   *read_rasterdata_rgb(tile_state, config, raster_data, reuse_buffer=True))
 
-        overview_level = VALID_OVERVIEWS[config.pixel_size]
+    except Exception as e:
+        raise IOError(f"RGB raster processing failed: {str(e)}") from e
 
-        point = (tile_state.lon, tile_state.lat)
-        raster_hw = config.shape[1]  # assumption raster is squaRe
 
-        with rio.open(raster_data["RGB_raster"], overview_level=overview_level) as src:
-            window, profile = prepare_raster_window(src, point, config)
-            data = src.read(window=window, boundless=True)
+def read_rasterdata(tile_state: DownloadState, config: ConfigManager, raster_data: pd.Series) -> RasterWindow:
+    """
+    Read the raster window of a tile based on the channel count.
 
-            # experimental check? should be portable to both rgb and rgbnir
-            process_raster_data(tile_state=tile_state,
-                                config=config,
-                                data=data,
-                                raster_profile=profile,
-                                window=window,
-                                src_transform=src.transform,
-                                )
+    Used by the reader threads of the concurrent and pipeline download methods, which already read many tiles
+    at once, so all windows of a tile are read by the calling thread.
+    """
+    try:
+        if config.shape[0] == 3:
+            return read_rasterdata_rgb(tile_state, config, raster_data)
+        elif config.shape[0] == 4:
+            return read_rasterdata_rgbn(tile_state, config, raster_data, overlap_reads=False)
+    except Exception as e:
+        raise IOError(f"Raster read failed: {str(e)}") from e
+    raise ValueError(f"Invalid channel count: {config.shape[0]}. Must be 3 (RGB) or 4 (RGB and NIR).")
 
-        return raster_data
 
-    except Exception as e:
-        raise IOError(f"RGB raster processing failed: {str(e)}") from e
+def locate_raster_window(
+        tile_state: DownloadState,
+        config: ConfigManager,
+        raster_data: pd.Series
+) -> Tuple[rio.DatasetReader, Window, Dict]:
+    """Get the pooled RGB mosaic of a tile together with its window and output profile, without reading data."""
+    with tile_state.timed('raster_open'):
+        src = open_raster(raster_data["RGB_raster"], VALID_OVERVIEWS[config.source_pixel_size])
+    window, profile = prepare_raster_window(src, (tile_state.lon, tile_state.lat), config,
+                                            offset=tile_state.window_offset)
+    return src, window, profile
+
+
+def read_rasterdata_rgb(
+        tile_state: DownloadState,
+        config: ConfigManager,
+        raster_data: pd.Series,
+        reuse_buffer: bool = False
+) -> RasterWindow:
+    """
+    Read the RGB window of a tile from the pooled mosaic, filling areas outside of it with the nodata value.
+
+    If reuse_buffer is set, the window is read into the thread's read buffer, which is overwritten by its next read.
+    """
+    src, window, profile = locate_raster_window(tile_state, config, raster_data)
+    data = window_buffer((src.count, *read_shape(config)), src.dtypes[0], reuse_buffer)
+    with tile_state.timed('raster_read'):
+        request(src.name, src.read, window=window, boundless=True, out=data, fill_value=config.nodata_value,
+                resampling=Resampling[config.resampling])
+    tile_state.raster_bytes += data.nbytes
+
+    return RasterWindow(data=data, profile=profile, window=window, src_transform=src.transform)
+
+
+def window_transform(window: Window, src_transform: rio.Affine, config: ConfigManager) -> rio.Affine:
+    """Transform of the output raster of a window, scaled to resample_size if set."""
+    if config.resample_size is None:
+        # define normal transformation here (no upsampling done)
+        return rio.windows.transform(window, src_transform)
+
+    raster_hw = config.shape[1]  # assumption raster is squaRe
+
+    # Modify transform
+    window = Window(window.col_off, window.row_off, raster_hw, raster_hw)
+
+    # Scale factor: 1 / (old pixel size  / new pixel size) -> division as Affine doesnt accept division
+    scale_factor = 1 / (src_transform[0] / config.resample_size)
+
+    # calculate neW trafo based on new window
+    new_transform = rio.windows.transform(window, src_transform)
+    return new_transform * new_transform.scale(scale_factor, scale_factor)
+
+
+def describe_raster_tile(profile: Dict, window: Window, src_transform: rio.Affine, config: ConfigManager) -> RasterTile:
+    """Describe the raster tile a window will be written as, before reading or processing it."""
+    height, width = (config.shape[1], config.shape[1]) if config.resample_size is not None else \
+        (profile['height'], profile['width'])
+    return RasterTile(crs=profile['crs'], transform=window_transform(window, src_transform, config),
+                      height=height, width=width)
 
 
 def process_raster_data(tile_state: DownloadState,
@@ -208,60 +447,72 @@ def process_raster_data(tile_state: DownloadState,
                         data: np.ndarray,
                         raster_profile: Dict,
                         window: Window,
-                        src_transform: rasterio.transform.Affine) -> None:
+                        src_transform: rasterio.transform.Affine) -> Optional[RasterTile]:
+    with tile_state.timed('resample'):
+        # the product is written before this thread handles its next tile, so the resampling buffer can be reused
+        product = compute_raster_data(tile_state, config, data, raster_profile, window, src_transform,
+                                      reuse_buffer=True)
+    if product is None:
+        return None
+
+    with tile_state.timed('raster_write'):
+        save_raster_data(
+            data=product.data,
+            profile=product.profile,
+            config=config,
+            tile_state=tile_state,
+            transform=product.transform
+        )
+
+    return RasterTile(crs=product.profile['crs'], transform=product.transform,
+                      height=product.profile['height'], width=product.profile['width'])
+
+
+def compute_raster_data(tile_state: DownloadState,
+                        config: ConfigManager,
+                        data: np.ndarray,
+                        raster_profile: Dict,
+                        window: Window,
+                        src_transform: rasterio.transform.Affine,
+                        reuse_buffer: bool = False) -> Optional[RasterProduct]:
+    """
+    Pad and resample the raw window data of a tile, None if the tile is removed for containing NoData.
+
+    If reuse_buffer is set, the data is resampled into the per-thread resampling buffer (see window_buffer),
+    so the product must be consumed before the thread computes its next tile.
+    """
     raster_hw = config.shape[1]  # assumption raster is squaRe
-    # If the data is not already of shape of the blocksize, pad it
-    data_total = pad_tensor(data, tile_state, href=raster_profile["height"], wref=raster_profile["width"],
-                            nodata_method=config.nodata_mode)
+    # windows are read boundless, so areas outside of the mosaic are already filled with the nodata value
+    data_total = check_nodata(data, tile_state, nodata_value=config.nodata_value, nodata_method=config.nodata_mode)
 
     if data_total is None:
         # creation option for nodata is on remove
         tile_state.set_raster_failed()
         print(
             f'Removed raster {config.outpath} as NoData values were contained and nodata_mode={config.nodata_mode}')
-    else:
-        # resample and resize
-        if config.resample_size is not None:
-            # Resample Image
-            data_total = np.array([
-                Image.fromarray(data_total[channel]).resize(size=(raster_hw, raster_hw),
-                                                            resample=Image.Resampling.LANCZOS)
-                for channel in range(data_total.shape[0])
-            ])
-
-            # Modify transform
-            window = Window(window.col_off, window.row_off, raster_hw, raster_hw)
-
-            # Scale factor: 1 / (old pixel size  / new pixel size) -> division as Affine doesnt accept division
-            scale_factor = 1 / (src_transform[0] / config.resample_size)
-
-            # calculate neW trafo based on new window
-            new_transform = rio.windows.transform(window, src_transform)
-            trafo = new_transform * new_transform.scale(scale_factor, scale_factor)
-
-            # update profiler
-            raster_profile.update({
-                'height': raster_hw,
-                'width': raster_hw
-            })
-        else:
-            # define normal transformation here (no upsampling done)
-            trafo = rio.windows.transform(window, src_transform)
+        return None
 
-        tile_state.set_raster_successful()
-        raster_profile.update({'count': data_total.shape[0], 'nodata': config.nodata_value})
-        save_raster_data(
-            data=data_total,
-            profile=raster_profile,
-            config=config,
-            tile_state=tile_state,
-            transform=trafo
-        )
+    # resample and resize, unless GDAL already did while reading
+    if config.resample_size is not None and data_total.shape[1:] != (raster_hw, raster_hw):
+        out = window_buffer((data_total.shape[0], raster_hw, raster_hw), data_total.dtype, reuse_buffer,
+                            slot='resample')
+        data_total = resample(data_total, (raster_hw, raster_hw), engine=config.resample_engine, out=out,
+                              method=config.resampling)
 
-    return
+        # update profiler
+        raster_profile.update({
+            'height': raster_hw,
+            'width': raster_hw
+        })
+
+    trafo = window_transform(window, src_transform, config)
 
+    tile_state.set_raster_successful()
+    raster_profile.update({'count': data_total.shape[0], 'nodata': config.nodata_value})
+    return RasterProduct(data=data_total, profile=raster_profile, transform=trafo)
 
-def download_rasterdata_rgbn(tile_state: DownloadState, config: ConfigManager, raster_data: pd.Series) -> pd.Series:
+
+def download_rasterdata_rgbn(tile_state: DownloadState, config: ConfigManager, raster_data: pd.Series) -> Optional[RasterTile]:
     """
     Download and process RGBN (RGB + Near Infrared) raster data.
 
@@ -271,205 +522,593 @@ def download_rasterdata_rgbn(tile_state: DownloadState, config: ConfigManager, r
         raster_data: Metadata Series with download URL
 
     Returns:
-        pd.Series: Metadata about the downloaded raster data.
+        Optional[RasterTile]: Description of the written raster tile, None if it was removed.
 
     Raises:
         ValueError: If the requested area is invalid.
         IOError: If raster processing fails.
     """
     try:
+        # experimental check? should be portable to both rgb and rgbnir
+        return process_raster_data(tile_state, config,
+                                   *read_rasterdata_rgbn(tile_state, config, raster_data, reuse_buffer=True))
 
-        overview_level = VALID_OVERVIEWS[config.pixel_size]
+    except Exception as e:
+        raise IOError(f"RGBN raster processing failed: {str(e)}") from e
 
-        point = (tile_state.lon, tile_state.lat)
 
-        with rio.open(raster_data["RGB_raster"], overview_level=overview_level) as src_rgb:
-            window, profile = prepare_raster_window(src_rgb, point, config)
-            data_rgb = src_rgb.read(window=window, boundless=True)
+def read_rasterdata_rgbn(
+        tile_state: DownloadState,
+        config: ConfigManager,
+        raster_data: pd.Series,
+        reuse_buffer: bool = False,
+        overlap_reads: bool = True
+) -> RasterWindow:
+    """
+    Read the RGB and NIR windows of a tile into one buffer, see read_rasterdata_rgb.
 
-            with rio.open(raster_data["NIR_raster"], overview_level=overview_level) as src_nir:
-                data_nir = src_nir.read(window=window, boundless=True)
-                data_total = np.concatenate([data_rgb, data_nir], axis=0)
+    If overlap_reads is set, the NIR window is read concurrently on the process' read thread. This only pays
+    off for a single reading thread per process, as all overlapped reads of a process share that thread.
+    """
+    overview_level = VALID_OVERVIEWS[config.source_pixel_size]
+    src_rgb, window, profile = locate_raster_window(tile_state, config, raster_data)
+
+    # read RGB and NIR into one buffer, GDAL releases the GIL during I/O
+    data_total = window_buffer((4, *read_shape(config)), src_rgb.dtypes[0], reuse_buffer)
+    nir_args = (raster_data["NIR_raster"], overview_level, window, data_total[3:], config.gdal_env,
+                config.resampling, config.nodata_value)
+    with tile_state.timed('raster_read'):
+        nir_read = get_read_executor().submit(read_window, *nir_args) if overlap_reads else None
+        request(src_rgb.name, src_rgb.read, window=window, boundless=True, out=data_total[:3],
+                fill_value=config.nodata_value, resampling=Resampling[config.resampling])
+        if nir_read is None:
+            read_window(*nir_args)
+        else:
+            nir_read.result()
+    tile_state.raster_bytes += data_total.nbytes
 
-                # experimental check? should be portable to both rgb and rgbnir
-                process_raster_data(tile_state=tile_state,
-                                    config=config,
-                                    data=data_total,
-                                    raster_profile=profile,
-                                    window=window,
-                                    src_transform=src_rgb.transform,
-                                    )
+    return RasterWindow(data=data_total, profile=profile, window=window, src_transform=src_rgb.transform)
 
-        return raster_data
 
-    except Exception as e:
-        raise IOError(f"RGBN raster processing failed: {str(e)}") from e
+# Helper functions
+def open_raster(url: str, overview_level: OverviewLevel) -> rio.DatasetReader:
+    """
+    Get an open dataset from the worker's raster pool, opening it on a miss.
+
+    Reusing datasets avoids fetching the header and IFDs of the same remote COG for every tile. The least
+    recently used dataset is closed once more than RASTER_POOL_SIZE datasets are open. Returned datasets
+    are owned by the pool and must not be closed by the caller.
+    """
+    pool = _RASTER_POOL
+    if pool.pid != os.getpid():
+        # handles inherited from a forked parent must not be shared
+        pool.pid = os.getpid()
+        pool.datasets = OrderedDict()
+
+    key = (url, overview_level)
+    src = pool.datasets.get(key)
+    if src is not None and not src.closed:
+        pool.datasets.move_to_end(key)
+        return src
+
+    src = request(url, rio.open, url, overview_level=overview_level)
+    pool.datasets[key] = src
+    while len(pool.datasets) > RASTER_POOL_SIZE:
+        _, evicted = pool.datasets.popitem(last=False)
+        evicted.close()
+    return src
+
+
+@contextmanager
+def vector_env(gdal_env: Dict[str, Any]) -> Iterator[None]:
+    """
+    Apply GDAL configuration options to vector reads, which use the separate GDAL library of pyogrio.
+
+    pyogrio options are process-wide, so they are set by the first and restored by the last of any
+    concurrently active environments.
+    """
+    with _VECTOR_ENV_LOCK:
+        if _VECTOR_ENV['depth'] == 0:
+            _VECTOR_ENV['previous'] = {k: pyogrio.get_gdal_config_option(k) for k in gdal_env}
+            pyogrio.set_gdal_config_options(gdal_env)
+        _VECTOR_ENV['depth'] += 1
+    try:
+        yield
+    finally:
+        with _VECTOR_ENV_LOCK:
+            _VECTOR_ENV['depth'] -= 1
+            if _VECTOR_ENV['depth'] == 0:
+                pyogrio.set_gdal_config_options(_VECTOR_ENV['previous'])
+
+
+def get_read_executor() -> ThreadPoolExecutor:
+    """Get the thread pool of the current process for concurrent window reads."""
+    executor = _READ_EXECUTOR.get(os.getpid())
+    if executor is None:
+        # threads do not survive a fork, so every worker process creates its own pool
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="austriadownloader-read")
+        _READ_EXECUTOR[os.getpid()] = executor
+    return executor
+
+
+def read_window(
+        url: str,
+        overview_level: OverviewLevel,
+        window: Window,
+        out: np.ndarray,
+        gdal_env: Dict[str, Any],
+        resampling: str = 'lanczos',
+        fill_value: int = 0
+) -> None:
+    """
+    Read a boundless window of a pooled raster into out, within the given GDAL environment of this thread.
+
+    The window is resampled with the given method if out differs from the window's shape, areas outside of
+    the raster are set to fill_value.
+    """
+    with rio.Env(**gdal_env):
+        src = open_raster(url, overview_level)
+        request(url, src.read, window=window, boundless=True, out=out, fill_value=fill_value,
+                resampling=Resampling[resampling])
+
+
+def window_buffer(shape: Tuple[int, ...], dtype: str, reuse: bool = False, slot: str = 'read') -> np.ndarray:
+    """
+    Get an uninitialized output array for a window read.
+
+    If reuse is set, this is the buffer of the current thread for the given slot, which is only reallocated if the
+    shape or dtype changes. Its data must be consumed before the thread uses the same slot for the next tile.
+    """
+    if not reuse:
+        return np.empty(shape, dtype=dtype)
+
+    buffer = _READ_BUFFER.data.get(slot)
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        buffer = _READ_BUFFER.data[slot] = np.empty(shape, dtype=dtype)
+    return buffer
+
+
+def close_rasters() -> None:
+    """Close all datasets held by the current worker's raster pool."""
+    pool = _RASTER_POOL
+    if pool.pid == os.getpid():
+        for src in pool.datasets.values():
+            src.close()
+    pool.datasets.clear()
+
+
+def get_transformer(from_crs: Any, to_crs: Any) -> Transformer:
+    """
+    Get a cached Transformer between two coordinate reference systems.
+
+    Transformers are created once per (from_crs, to_crs) pair and shared process-wide. Since pyproj 3.1
+    Transformer objects are thread-safe, the lock only guards the cache itself.
+    """
+    key = (str(from_crs), str(to_crs))
+    transformer = _TRANSFORMER_CACHE.get(key)
+    if transformer is None:
+        with _TRANSFORMER_LOCK:
+            transformer = _TRANSFORMER_CACHE.get(key)
+            if transformer is None:
+                transformer = Transformer.from_crs(from_crs, to_crs, always_xy=True)
+                _TRANSFORMER_CACHE[key] = transformer
+    return transformer
 
 
-# Helper functions
 def transform_coordinates(
         point: Coordinates,
-        from_crs: str,
-        to_crs: str
+        from_crs: Any,
+        to_crs: Any
 ) -> Coordinates:
     """Transform coordinates between coordinate reference systems."""
-    transformer = Transformer.from_crs(from_crs, to_crs, always_xy=True)
-    return transformer.transform(*point)
+    return get_transformer(from_crs, to_crs).transform(*point)
+
+
+def transform_coordinates_array(
+        x: np.ndarray,
+        y: np.ndarray,
+        from_crs: Any,
+        to_crs: Any
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Transform arrays of coordinates between coordinate reference systems in a single call."""
+    return get_transformer(from_crs, to_crs).transform(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
 
 
 def get_intersecting_cadastral(point_geometry: Point) -> pd.Series | None:
     """Get cadastral data intersecting with the given point."""
-    intersecting = AUSTRIA_CADASTRAL[
-        AUSTRIA_CADASTRAL.intersects(point_geometry, align=True)
-    ]
-    if intersecting.empty:
+    # query the spatial index instead of scanning every footprint
+    intersecting = get_cadastral_data().sindex.query(point_geometry, predicate="intersects")
+    if intersecting.size == 0:
         warnings.warn("Skipping: Location is outside Austria's cadastral boundaries", UserWarning)
         return None
         # raise ValueError("Location is outside Austria's cadastral boundaries")
     else:
-        return intersecting.iloc[0]
+        # first matching footprint in table order
+        return get_cadastral_data().iloc[intersecting.min()]
+
+
+def get_cadastral_by_index(meta_index: int) -> pd.Series | None:
+    """Get cadastral data by a positional index obtained from match_cadastral (-1 if unmatched)."""
+    if meta_index < 0:
+        warnings.warn("Skipping: Location is outside Austria's cadastral boundaries", UserWarning)
+        return None
+    return get_cadastral_data().iloc[meta_index]
+
+
+def match_cadastral(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """
+    Assign a cadastral footprint to every point in a single spatial-index pass.
+
+    Args:
+        lon: Longitudes in WGS84.
+        lat: Latitudes in WGS84.
+
+    Returns:
+        np.ndarray: Positional index into AUSTRIA_CADASTRAL per point, -1 where no footprint intersects.
+    """
+    x, y = transform_coordinates_array(lon, lat, from_crs=WGS84, to_crs=AUSTRIA_CRS)
+    points = shapely.points(x, y)
+
+    point_idx, tree_idx = get_cadastral_data().sindex.query(points, predicate="intersects")
+
+    # keep the first footprint per point, consistent with get_intersecting_cadastral
+    order = np.lexsort((tree_idx, point_idx))
+    point_idx, tree_idx = point_idx[order], tree_idx[order]
+    _, first = np.unique(point_idx, return_index=True)
+
+    matched = np.full(len(points), -1, dtype=np.int64)
+    matched[point_idx[first]] = tree_idx[first]
+    return matched
+
+
+def read_parcels(vector_url: str, config: ConfigManager, bbox: BoundingBox | None = None,
+                 mask: shapely.Geometry | None = None, bulk: bool = False) -> gpd.GeoDataFrame:
+    """Read the parcels of the configured classes within a bbox or mask, filtered by OGR. Set bulk for large areas."""
+    if not config.mask_label:
+        # no classes, no parcels, and 'NS IN ()' is invalid OGR SQL
+        return gpd.GeoDataFrame({"NS": pd.Series(dtype="int64")}, geometry=gpd.GeoSeries([], crs=AUSTRIA_CRS))
+
+    # only matching parcels and the NS column are decoded
+    labels = ", ".join(str(int(ml)) for ml in config.mask_label)
+    return (bulk_request if bulk else request)(vector_url, gpd.read_file, vector_url, layer=CADASTRAL_LAYER,
+                                               engine="pyogrio", bbox=bbox, mask=mask, where=f"NS IN ({labels})",
+                                               columns=["NS"], use_arrow=USE_ARROW)
+
+
+def prefetch_parcels(vector_url: str, extents: List[BoundingBox], config: ConfigManager) -> None:
+    """
+    Read all parcels intersecting the given tile extents once and index them in an STRtree.
+
+    Subsequent query_parcels calls of the same thread are answered from memory as long as their bbox
+    lies within the prefetched extents.
+
+    Args:
+        vector_url: Path of the cadastral GeoPackage.
+        extents: Bounding boxes (minx, miny, maxx, maxy) of the tiles of a footprint group in the Austrian CRS.
+        config: RConfigManager object.
+    """
+    mask = shapely.union_all(shapely.box(*zip(*extents)))
+    parcels = read_parcels(vector_url, config, mask=mask, bulk=True)
+    parcels.sindex  # build the spatial index once for all tiles
+
+    _PARCEL_CACHE.vector_url, _PARCEL_CACHE.mask, _PARCEL_CACHE.parcels = vector_url, mask, parcels
+
+
+def clear_parcels() -> None:
+    """Release the prefetched parcels of the current thread."""
+    _PARCEL_CACHE.vector_url, _PARCEL_CACHE.mask, _PARCEL_CACHE.parcels = None, None, None
+
+
+def query_parcels(vector_url: str, bbox: BoundingBox, config: ConfigManager) -> gpd.GeoDataFrame:
+    """Get the parcels of the configured classes intersecting bbox, from the prefetched parcels if possible."""
+    cache = _PARCEL_CACHE
+    bbox_poly = shapely.box(*bbox)
+    if cache.parcels is not None and cache.vector_url == vector_url and cache.mask.contains(bbox_poly):
+        # keep the order of the prefetched table
+        return cache.parcels.iloc[np.sort(cache.parcels.sindex.query(bbox_poly, predicate="intersects"))]
+    return read_parcels(vector_url, config, bbox=bbox)
 
 
 def process_vector_data(
         vector_url: str,
         config: ConfigManager,
-        tile_state: DownloadState
+        tile_state: DownloadState,
+        raster_tile: RasterTile
+) -> None:
+    """Process and save vector data within the bounding box of the raster tile."""
+    with tile_state.timed('vector_query'):
+        parcels = read_vector_data(vector_url, config, raster_tile)
+    rasterize_vector_data(parcels, config, tile_state, raster_tile)
+    return
+
+
+def read_vector_data(vector_url: str, config: ConfigManager, raster_tile: RasterTile) -> gpd.GeoDataFrame:
+    """Read the parcels of the configured classes within the bounding box of the raster tile."""
+    # transform bbox from local raster crs to austrian crs, all vertices in one call by the cached transformer
+    bbox = shapely.transform(
+        shapely.geometry.box(*raster_tile.bounds),
+        lambda coords: np.column_stack(transform_coordinates_array(coords[:, 0], coords[:, 1],
+                                                                   from_crs=raster_tile.crs, to_crs=AUSTRIA_CRS))
+    ).bounds
+
+    # bbox and class filter are evaluated by OGR or the prefetched parcels of the footprint group
+    return query_parcels(vector_url, bbox, config)
+
+
+def rasterize_vector_data(
+        filtered_features: gpd.GeoDataFrame,
+        config: ConfigManager,
+        tile_state: DownloadState,
+        raster_tile: RasterTile
 ) -> None:
-    """Process and save vector data within the specified bounding box."""
+    """Rasterize the parcels onto the raster tile, collect class statistics and save the mask."""
+    with tile_state.timed('rasterize'):
+        product = compute_mask_data(filtered_features, config, tile_state, raster_tile)
+    with tile_state.timed('mask_write'):
+        write_mask_data(product, config, tile_state, raster_tile)
+    return
+
+
+def compute_mask_data(
+        filtered_features: gpd.GeoDataFrame,
+        config: ConfigManager,
+        tile_state: DownloadState,
+        raster_tile: RasterTile
+) -> MaskProduct:
+    """Rasterize the parcels onto the raster tile and collect the class statistics of the mask."""
+    # Objects ahve been found and will be transformed into raster
+    if len(filtered_features) > 0:
+        # convert austrian crs vector geoemtries to raster specific local crs
+        gdf = filtered_features.rename(columns={"NS": "label"})
+        gdf.to_crs(crs=raster_tile.crs, inplace=True)
+
+        # if set, apply the class remapping
+        if config.mask_remapping is not None:
+            gdf['label'] = gdf['label'].replace(config.mask_remapping)
+
+        # Rasterize the geometries into the raster
+        shapes = [(row.geometry, row.label) for row in gdf.itertuples()]
+        binary_raster = rasterize(shapes, out_shape=config.shape[1:], transform=raster_tile.transform,
+                                  fill=0)
+
+        # add number of objects to state manager
+        num_px = config.shape[1] * config.shape[2]
+        counts = gdf['label'].value_counts().to_dict()
+
+        pixel_labels = config.mask_label if config.mask_remapping is None else set(config.mask_remapping.values())
+        stats = class_statistics(binary_raster, extended=config.extended_stats)
+
+        # add no data value
+        tile_state.class_distributions[0] = round(int(stats['histogram'][0]) / num_px, 3)
+
+        for ml in pixel_labels: #config.mask_label
+            count = int(stats['histogram'][ml]) if ml < len(stats['histogram']) else 0
+            tile_state.class_distributions[ml] = round(count / num_px, 3)
+            tile_state.class_instance_count[ml] = counts[ml] if ml in counts else 0
 
+            if config.extended_stats:
+                tile_state.class_bboxes[ml] = stats['bboxes'].get(ml)
+                tile_state.class_edge_pixels[ml] = stats['edge_pixels'].get(ml, 0)
+
+        return MaskProduct(mask=binary_raster, parcels=gdf)
+
+    # write empty image
+    print(f'    No results for class {config.mask_label} at lat: {tile_state.lat} // lon: {tile_state.lon}')
+    return MaskProduct(mask=np.zeros((config.shape[1], config.shape[1]), dtype=np.uint8), parcels=None)
+
+
+def write_mask_data(product: MaskProduct, config: ConfigManager, tile_state: DownloadState,
+                    raster_tile: RasterTile) -> None:
+    """Save the mask of a tile and, if requested, its parcels."""
     # Without file extension!
     fp = config.outpath / 'target' / f"{config.outfile_prefixes['vector']}_{tile_state.id}"
 
-    # extract bbox from raster
-    with rio.open(config.outpath / 'input' / f"{config.outfile_prefixes['raster']}_{tile_state.id}.tif") as img_src:
-
-        def project_coords(x, y):
-            # shitty iterative trafo hack for crs_from local
-            transformer = Transformer.from_crs(img_src.crs, AUSTRIA_CRS, always_xy=True)
-            return transformer.transform(x, y)
-
-        minx, maxy = img_src.transform * (0, 0)
-        maxx, miny = img_src.transform * (img_src.profile['width'], img_src.profile['width'])
-
-        # transform from local raster crs to austrian crs
-        bbox_poly = shapely.geometry.box(minx, miny, maxx, maxy)
-        bbox = shapely.ops.transform(project_coords, bbox_poly).bounds
-
-        with fiona.open(vector_url, layer="NFL") as src:
-            # conversion to gdf: removed any property values
-            filtered_features = [
-                {"geometry": shape(feat["geometry"]),
-                 "label": feat["properties"].get("NS")}
-                    for feat in src.filter(bbox=bbox)
-                        if feat["properties"].get("NS") in config.mask_label
-            ]
-
-            # Objects ahve been found and will be transformed into raster
-            if len(filtered_features) > 0:
-                # convert austrian crs vector geoemtries to raster specific local crs
-                gdf = gpd.GeoDataFrame(filtered_features, crs=src.crs)
-                gdf.to_crs(crs=img_src.crs, inplace=True)
-
-                # if set, apply the class remapping
-                if config.mask_remapping is not None:
-                    gdf['label'] = gdf['label'].replace(config.mask_remapping)
-
-                # if requested provide transformed vector file
-                if config.create_gpkg:
-                    gdf.to_file(fp.with_suffix(".gpkg"), driver='GPKG', layer='NFL')
-
-                # Rasterize the geometries into the raster
-                shapes = [(row.geometry, row.label) for row in gdf.itertuples()]
-                binary_raster = rasterize(shapes, out_shape=config.shape[1:], transform=img_src.transform,
-                                          fill=0)
-
-                # add number of objects to state manager
-                num_px = config.shape[1] * config.shape[2]
-                counts = gdf['label'].value_counts().to_dict()
-
-                # add no data value
-                tile_state.class_distributions[0] = round(np.count_nonzero(binary_raster == 0) / num_px, 3)
-
-                pixel_labels = config.mask_label if config.mask_remapping is None else set(config.mask_remapping.values())
-
-                for ml in pixel_labels: #config.mask_label
-                    count = np.count_nonzero(binary_raster == ml)
-                    tile_state.class_distributions[ml] = round(count / num_px, 3)
-                    tile_state.class_instance_count[ml] = counts[ml] if ml in counts else 0
-
-                # Save the rasterized binary image
-                with rio.open(
-                        fp=fp.with_suffix(".tif"),
-                        mode="w+",
-                        driver="GTiff",
-                        height=config.shape[1],
-                        width=config.shape[1],
-                        count=1,
-                        dtype=np.uint8,
-                        crs=img_src.crs,
-                        transform=img_src.transform
-                ) as dst:
-                    dst.write(binary_raster, 1)
-            # write empty image
-            else:
-                print(f'    No results for class {config.mask_label} at lat: {tile_state.lat} // lon: {tile_state.lon}')
-                with rio.open(config.outpath / 'input' / f"input_{tile_state.id}.tif") as img_src:
-                    binary_raster = np.zeros((config.shape[1], config.shape[1]), dtype=np.uint8)
-
-                    # Save the rasterized binary image
-                    with rio.open(
-                            fp=fp.with_suffix(".tif"),
-                            mode="w+",
-                            driver="GTiff",
-                            height=config.shape[1],
-                            width=config.shape[1],
-                            count=1,
-                            dtype=np.uint8,
-                            crs=img_src.crs,
-                            transform=img_src.transform
-                    ) as dst:
-                        dst.write(binary_raster, 1)
+    # if requested provide transformed vector file
+    if config.create_gpkg and product.parcels is not None:
+        product.parcels.to_file(fp.with_suffix(".gpkg"), driver='GPKG', layer='NFL')
+
+    # Save the rasterized binary image
+    with rio.open(
+            fp=fp.with_suffix(".tif"),
+            mode="w+",
+            driver="GTiff",
+            height=config.shape[1],
+            width=config.shape[1],
+            count=1,
+            dtype=np.uint8,
+            crs=raster_tile.crs,
+            transform=raster_tile.transform
+    ) as dst:
+        dst.write(product.mask, 1)
     return
 
 
+def class_statistics(mask: np.ndarray, extended: bool = False) -> Dict[str, Any]:
+    """
+    Compute the class statistics of a label mask in a single pass per statistic.
+
+    Args:
+        mask: 2D array of non-negative integer class labels.
+        extended: Additionally compute per-class bounding boxes and edge pixel counts.
+
+    Returns:
+        Dict[str, Any]: 'histogram' with the pixel count per label value. If extended, also 'bboxes' mapping
+        every present label to (row_min, col_min, row_max, col_max) and 'edge_pixels' mapping every present
+        label to the number of its pixels bordering another label (4-neighbourhood).
+    """
+    labels = mask.ravel()
+    stats: Dict[str, Any] = {'histogram': np.bincount(labels)}
+    if not extended:
+        return stats
+
+    h, w = mask.shape
+    n = len(stats['histogram'])
+    present = np.flatnonzero(stats['histogram'])
+
+    # per-class extent via scatter-min/max of all row and column indices at once
+    rows = np.repeat(np.arange(h), w)
+    cols = np.tile(np.arange(w), h)
+    row_min, col_min = np.full(n, h), np.full(n, w)
+    row_max, col_max = np.full(n, -1), np.full(n, -1)
+    np.minimum.at(row_min, labels, rows)
+    np.minimum.at(col_min, labels, cols)
+    np.maximum.at(row_max, labels, rows)
+    np.maximum.at(col_max, labels, cols)
+    stats['bboxes'] = {int(k): (int(row_min[k]), int(col_min[k]), int(row_max[k]), int(col_max[k])) for k in present}
+
+    # a pixel is an edge pixel if any 4-neighbour has a different label
+    edge = np.zeros(mask.shape, dtype=bool)
+    vertical = mask[1:, :] != mask[:-1, :]
+    horizontal = mask[:, 1:] != mask[:, :-1]
+    edge[1:, :] |= vertical
+    edge[:-1, :] |= vertical
+    edge[:, 1:] |= horizontal
+    edge[:, :-1] |= horizontal
+    edge_counts = np.bincount(mask[edge], minlength=n)
+    stats['edge_pixels'] = {int(k): int(edge_counts[k]) for k in present}
+
+    return stats
+
+
+def window_size(config: ConfigManager) -> Tuple[int, int]:
+    """Height and width of the source window, enlarged by the resampling factor if resample_size is set."""
+    if config.resample_size is not None:
+        # reshape Window for increased coverage area, in pixels of the overview read from
+        scaling_factor = config.resample_size / config.source_pixel_size
+        adjusted_window_size = int(config.shape[1] * scaling_factor)
+        return adjusted_window_size, adjusted_window_size
+    return config.shape[1], config.shape[2]
+
+
+def plan_raster_windows(
+        lon: np.ndarray,
+        lat: np.ndarray,
+        meta_index: np.ndarray,
+        config: ConfigManager
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the raster window offsets of all tiles at the configured overview level.
+
+    Tiles are grouped by their matched RGB mosaic, whose CRS and transform are read once per group. Coordinates
+    of each group are then projected and converted to pixel indices with array operations. Planned windows
+    reaching beyond the mosaic or its footprint in AUSTRIA_CADASTRAL contain NoData, which is known before
+    reading any pixels.
+
+    Args:
+        lon: Longitudes in WGS84.
+        lat: Latitudes in WGS84.
+        meta_index: Positional index into AUSTRIA_CADASTRAL per tile as returned by match_cadastral.
+        config: RConfigManager object.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Row and column offsets per tile, NaN where no window could be
+            planned, and whether the planned window contains NoData.
+    """
+    overview_level = VALID_OVERVIEWS[config.source_pixel_size]
+    h, w = window_size(config)
+    lon, lat, meta_index = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float), np.asarray(meta_index)
+
+    row_off = np.full(len(lon), np.nan)
+    col_off = np.full(len(lon), np.nan)
+    nodata = np.zeros(len(lon), dtype=bool)
+
+    raster_urls = get_cadastral_data()["RGB_raster"].to_numpy()
+    matched = meta_index >= 0
+    for url in np.unique(raster_urls[meta_index[matched]]):
+        group = matched & (raster_urls[np.where(matched, meta_index, 0)] == url)
+
+        try:
+            with rio.Env(**config.gdal_env), request(url, rio.open, url, overview_level=overview_level) as src:
+                crs, transform, height, width = src.crs, src.transform, src.height, src.width
+        except rio.errors.RasterioIOError as e:
+            # leave the group unplanned, windows are then computed per tile
+            warnings.warn(f"Could not plan windows for {url}: {e}", UserWarning)
+            continue
+
+        x, y = transform_coordinates_array(lon[group], lat[group], from_crs=WGS84, to_crs=crs)
+        rows, cols = rasterio.transform.rowcol(transform, x, y)
+        row_off[group] = np.asarray(rows) - h // 2
+        col_off[group] = np.asarray(cols) - w // 2
+        nodata[group] = window_nodata(row_off[group], col_off[group], meta_index[group], (h, w),
+                                      transform, (height, width), crs)
+
+    return row_off, col_off, nodata
+
+
+def window_nodata(
+        row_off: np.ndarray,
+        col_off: np.ndarray,
+        meta_index: np.ndarray,
+        size: Tuple[int, int],
+        transform: rio.Affine,
+        raster_shape: Tuple[int, int],
+        crs: Any
+) -> np.ndarray:
+    """
+    Check which planned windows of a mosaic are not completely covered by valid data.
+
+    A window contains NoData if it exceeds the pixel extent of the mosaic or is not within the footprint
+    geometry of its tile in AUSTRIA_CADASTRAL.
+
+    Args:
+        row_off: Row offsets of the windows.
+        col_off: Column offsets of the windows.
+        meta_index: Positional index into AUSTRIA_CADASTRAL per window.
+        size: Height and width of the windows.
+        transform: Transform of the mosaic at the overview level read.
+        raster_shape: Height and width of the mosaic at the overview level read.
+        crs: CRS of the mosaic.
+
+    Returns:
+        np.ndarray: True where the window contains NoData.
+    """
+    h, w = size
+    outside = (row_off < 0) | (col_off < 0) | (row_off + h > raster_shape[0]) | (col_off + w > raster_shape[1])
+
+    # project every footprint once and test all window boxes against it
+    footprints, inverse = np.unique(meta_index, return_inverse=True)
+    geometries = get_cadastral_data().geometry.iloc[footprints].to_crs(crs).to_numpy()
+    shapely.prepare(geometries)
+
+    x0, y0 = transform * (col_off, row_off)
+    x1, y1 = transform * (col_off + w, row_off + h)
+    boxes = shapely.box(np.minimum(x0, x1), np.minimum(y0, y1), np.maximum(x0, x1), np.maximum(y0, y1))
+    return outside | ~shapely.contains(geometries[inverse], boxes)
+
+
+def read_shape(config: ConfigManager) -> Tuple[int, int]:
+    """Height and width of the data read for a window, the target shape if GDAL resamples while reading."""
+    if config.resample_size is not None and config.resample_engine == 'gdal':
+        return config.shape[1], config.shape[2]
+    return window_size(config)
+
+
 def prepare_raster_window(
         src: rio.DatasetReader,
         point: Coordinates,
-        config: ConfigManager
+        config: ConfigManager,
+        offset: Tuple[int, int] | None = None
 ) -> Tuple[Window, Dict]:
-    """Prepare raster window and profile for data extraction."""
-    point_raster = transform_coordinates(
-        point,
-        from_crs=WGS84,
-        to_crs=src.crs
-    )
+    """Prepare raster window and profile for data extraction, using a planned (row, col) offset if given."""
+    h, w = window_size(config)
 
-    y, x = src.index(*point_raster)
-
-    h, w = config.shape[1:]
-    if config.resample_size is not None:
-        # reshape Windpow for inceades coverage area
-        scaling_factor = config.resample_size / config.pixel_size
-        adjusted_window_size = int(config.shape[1] * scaling_factor)
-        window = Window(
-            x - adjusted_window_size // 2,  # Start column (x)
-            y - adjusted_window_size // 2,  # Start row (y)
-            adjusted_window_size,  # Window width (adjusted for resolution)
-            adjusted_window_size  # Window height (adjusted for resolution)
+    if offset is None:
+        point_raster = transform_coordinates(
+            point,
+            from_crs=WGS84,
+            to_crs=src.crs
         )
-        h, w = adjusted_window_size, adjusted_window_size
+        y, x = src.index(*point_raster)
+        row_off, col_off = y - h // 2, x - w // 2
     else:
-        window = Window(
-            x - config.shape[2] // 2,
-            y - config.shape[1] // 2,
-            config.shape[2],
-            config.shape[1]
-        )
+        row_off, col_off = offset
+
+    window = Window(col_off, row_off, w, h)
 
     profile = src.profile.copy()
     profile.update({
-        'height': h,
-        'width': w,
+        'height': read_shape(config)[0],
+        'width': read_shape(config)[1],
         'compress': 'DEFLATE',
         'driver': 'GTiff',
         'photometric': None
@@ -499,38 +1138,33 @@ def save_raster_data(
         dst.write(data)
 
 
-def pad_tensor(data: np.ndarray, tile_state: DownloadState, href: int = 512, wref: int = 512, nodata_method: str = 'flag') -> Optional[np.ndarray]:
+def check_nodata(data: np.ndarray, tile_state: DownloadState, nodata_value: int = 0,
+                 nodata_method: str = 'flag') -> Optional[np.ndarray]:
     """
-    Pads a (3, H, W) tensor to (3, href, wref) by filling with zeros.
+    Flags a (C, H, W) tensor containing NoData, i.e. pixels with the nodata value in all bands.
 
     Args:
-        :param data: Input tensor of shape (3, H, W).
+        :param data: Input tensor of shape (C, H, W).
         :param tile_state: state
+        :param nodata_value: Value of NoData pixels, filled in by boundless reads.
         :param nodata_method: Either 'flag' or 'remove'
-        :param href: Padding image size.
-        :param wref: Padding image size.
 
     Returns:
-        np.ndarray: Zero-padded tensor of shape (3, href, wref).
+        np.ndarray: The unchanged tensor, None if it contains NoData and nodata_method is 'remove'.
     """
-    c, h, w = data.shape
-
-    if h == href and w == wref:
-        return data  # No changes needed
-
-    # check for nodata_method
-    if nodata_method == 'flag':
-        print(f'Queryied window ({tile_state.id}) contains NoData values, set to: 0')
-
-        tile_state.ortho_contains_nodata = True
-
-        # Create a zero-filled array of the target shape
-        padded = np.zeros((c, href, wref), dtype=data.dtype)
-
-        # Copy the original data into the top-left corner of the padded array
-        padded[:, :h, :w] = data
-
-        return padded
-    elif nodata_method == 'remove':
-        tile_state.ortho_contains_nodata = True
-        return None
+    # windows reaching beyond the valid data have been flagged during planning, see plan_raster_windows
+    if not (tile_state.ortho_contains_nodata or contains_nodata(data, nodata_value)):
+        return data
+
+    tile_state.ortho_contains_nodata = True
+    return None if nodata_method == 'remove' else data
+
+
+def contains_nodata(data: np.ndarray, nodata_value: int = 0) -> bool:
+    """Check if any pixel of a (C, H, W) tensor has the nodata value in all bands, narrowing down band by band."""
+    candidates = data[0] == nodata_value
+    for band in data[1:]:
+        if not candidates.any():
+            return False
+        candidates &= band == nodata_value
+    return bool(candidates.any())
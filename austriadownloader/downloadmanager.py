@@ -1,29 +1,418 @@
 # Parent class: DownloadManager (Manages the overall download process)
+import cProfile
 import datetime
+import marshal
+import multiprocessing.util
 import os
 import pathlib
+import queue
+import sys
+import threading
+import time
+import warnings
 
 import yaml
+import numpy as np
 import pandas as pd
+import rasterio as rio
 
-from typing import Tuple, Optional, Dict
-from pydantic import BaseModel, Field, model_validator
+from typing import Tuple, Optional, Dict, List, Final, NamedTuple, Any, Iterator
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 from multiprocessing import Pool
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from tqdm import tqdm
 
 import austriadownloader
+from austriadownloader.cadastralcache import mirror_cadastral, extract_cadastral
 from austriadownloader.configmanager import ConfigManager
-from austriadownloader.downloadstate import DownloadState
+from austriadownloader.data import get_cadastral_data
+from austriadownloader.download import (match_cadastral, plan_raster_windows, close_rasters, transform_coordinates_array,
+                                        prefetch_parcels, clear_parcels, vector_env, fetch_tile, compute_tile,
+                                        resolve_metadata, locate_raster_window, describe_raster_tile, read_rasterdata,
+                                        read_vector_data, compute_raster_data, compute_mask_data, save_raster_data,
+                                        write_mask_data, TileFetch, WGS84, AUSTRIA_CRS, BoundingBox)
+from austriadownloader.downloadstate import DownloadState, StateLog, CompletionIndex, state_columns, TIMING_STAGES
+from austriadownloader.pipeline import Pipeline, Stage
+from austriadownloader.scheduler import configure_scheduler
+
+# Maximum number of consecutive tiles of one footprint handed to a worker at once
+SCHEDULE_CHUNK_SIZE: Final[int] = 32
+
+# Number of processed tiles after which logs are forced to disk
+CHECKPOINT_INTERVAL: Final[int] = 500
+
+# Percentiles of the per-tile stage timings summarized in the download log
+TIMING_PERCENTILES: Final = (50, 95, 99)
+
+
+def morton_code(x: np.ndarray, y: np.ndarray, bits: int = 21) -> np.ndarray:
+    """
+    Computes the Z-order (Morton) code of planar coordinates.
+
+    Coordinates are quantized to a grid of 2**bits cells per axis over their extent and the bits of both
+    cell indices are interleaved, so sorting by the code keeps nearby points close to each other.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+
+    def quantize(v: np.ndarray) -> np.ndarray:
+        span = v.max() - v.min() if v.size else 0.0
+        scaled = (v - v.min()) / span if span > 0 else np.zeros_like(v)
+        return np.minimum(scaled * (2 ** bits), 2 ** bits - 1).astype(np.uint64)
+
+    def spread(v: np.ndarray) -> np.ndarray:
+        # insert a zero bit between every bit of v
+        out = np.zeros_like(v)
+        for b in range(bits):
+            out |= ((v >> np.uint64(b)) & np.uint64(1)) << np.uint64(2 * b)
+        return out
+
+    return spread(quantize(x)) | (spread(quantize(y)) << np.uint64(1))
+
+
+class TileTask(NamedTuple):
+    """Compact description of a planned tile, sent to the download workers instead of DataFrame rows."""
+    id: str | int | float
+    lat: float
+    lon: float
+    meta_index: int | None = None
+    window_offset: Tuple[int, int] | None = None
+    vector_path: str | None = None
+    ortho_contains_nodata: bool = False  # the planned window reaches beyond the valid data
+
+
+def tile_tasks(tiles: pd.DataFrame) -> List[TileTask]:
+    """Converts tile rows into TileTasks, including planned values if available."""
+    tasks = []
+    for row in tiles.itertuples(index=False):
+        meta_index = getattr(row, 'meta_index', None)
+        row_off, col_off = getattr(row, 'row_off', None), getattr(row, 'col_off', None)
+        vector_path = getattr(row, 'vector_path', None)
+        nodata = getattr(row, 'ortho_contains_nodata', False)
+
+        tasks.append(TileTask(
+            id=row.id,
+            lat=row.lat,
+            lon=row.lon,
+            meta_index=None if pd.isna(meta_index) else int(meta_index),
+            window_offset=None if pd.isna(row_off) or pd.isna(col_off) else (int(row_off), int(col_off)),
+            vector_path=None if pd.isna(vector_path) else str(vector_path),
+            ortho_contains_nodata=bool(nodata),
+        ))
+    return tasks
+
+
+def create_state(task: TileTask) -> DownloadState:
+    """Creates the DownloadState of a tile task."""
+    return DownloadState(**task._asdict())
+
+
+def tile_extents(lon: np.ndarray, lat: np.ndarray, config: ConfigManager) -> List[BoundingBox]:
+    """Returns the bounding boxes of tiles in the Austrian CRS."""
+    x, y = transform_coordinates_array(lon, lat, from_crs=WGS84, to_crs=AUSTRIA_CRS)
+    # enlarge by sqrt(2) to cover rotations between the raster CRS and the Austrian CRS
+    half = (config.resample_size or config.pixel_size) * max(config.shape[1:]) / 2 * np.sqrt(2)
+    return list(zip(x - half, y - half, x + half, y + half))
+
+
+def prefetch_group(tasks: List[TileTask], config: ConfigManager) -> None:
+    """
+    Reads the cadastral parcels of a group of tiles sharing a footprint at once, if vector_batch is set.
+
+    A failed prefetch only warns, the tiles of the group then read their own parcels.
+    """
+    clear_parcels()
+    if not config.vector_batch or tasks[0].meta_index is None or tasks[0].meta_index < 0:
+        return
+
+    vector_url = tasks[0].vector_path or get_cadastral_data()['vector_url'].iloc[tasks[0].meta_index]
+    extents = tile_extents(np.array([t.lon for t in tasks]), np.array([t.lat for t in tasks]), config)
+
+    try:
+        with vector_env(config.gdal_env):
+            prefetch_parcels(vector_url, extents, config)
+    except Exception as e:
+        clear_parcels()
+        warnings.warn(f"Prefetching cadastral parcels failed: {e}", UserWarning)
+
+
+def stage_summary(state: pd.DataFrame | None) -> Dict[str, Dict[str, float]]:
+    """Summarizes the per-tile stage timings of the state log as percentiles and totals in seconds."""
+    summary = {}
+    for stage in TIMING_STAGES:
+        if state is None or f'time_{stage}' not in state:
+            continue
+        timings = state[f'time_{stage}'].dropna().to_numpy(dtype=float)
+        if timings.size == 0:
+            continue
+        percentiles = np.percentile(timings, TIMING_PERCENTILES)
+        summary[stage] = {**{f'p{q}': round(float(v), 4) for q, v in zip(TIMING_PERCENTILES, percentiles)},
+                          'total': round(float(timings.sum()), 2)}
+    return summary
+
+
+# Seconds between writing the profiles of a process, see profiled
+PROFILE_DUMP_INTERVAL: Final[float] = 60.0
+
+# Since Python 3.12 only one profiler may be active per process, it then records all threads
+SHARED_PROFILER: Final[bool] = sys.version_info >= (3, 12)
+
+# Profilers of the current process by file name, the number of units profiled by the shared profiler and
+# the time of the last dump, see profiled
+_PROFILES: Dict[str, Any] = {'pid': None, 'profilers': {}, 'active': 0, 'dumped': 0.0}
+_PROFILES_LOCK: Final[threading.Lock] = threading.Lock()
+
+
+def _start_profiler(config: ConfigManager) -> Optional[cProfile.Profile]:
+    """Enables the profiler of the current thread or process, None if profiling is not possible."""
+    with _PROFILES_LOCK:
+        if _PROFILES['pid'] != os.getpid():
+            # profilers inherited from a forked parent belong to the parent
+            _PROFILES.update(pid=os.getpid(), profilers={}, active=0, dumped=time.monotonic())
+            # written when a worker process exits normally
+            multiprocessing.util.Finalize(None, dump_profiles, args=(config,), exitpriority=10)
+
+        name = str(os.getpid()) if SHARED_PROFILER else f"{os.getpid()}_{threading.current_thread().name}"
+        profiler = _PROFILES['profilers'].setdefault(name, cProfile.Profile())
+        try:
+            if not SHARED_PROFILER or _PROFILES['active'] == 0:
+                profiler.enable()
+        except ValueError as e:
+            # another profiling tool is active, e.g. a debugger
+            warnings.warn(f"Could not profile worker: {e}", RuntimeWarning)
+            return None
+        _PROFILES['active'] += 1
+        return profiler
+
+
+def _stop_profiler(profiler: cProfile.Profile) -> None:
+    """Disables a profiler enabled by _start_profiler once its last unit of work has finished."""
+    with _PROFILES_LOCK:
+        _PROFILES['active'] -= 1
+        if not SHARED_PROFILER or _PROFILES['active'] == 0:
+            profiler.disable()
+
+
+def dump_profiles(config: ConfigManager) -> None:
+    """Writes the profiles of the current process to outpath/profiles, including those still recording."""
+    with _PROFILES_LOCK:
+        if _PROFILES['pid'] != os.getpid():
+            return
+        _PROFILES['dumped'] = time.monotonic()
+        try:
+            path = pathlib.Path(config.outpath) / 'profiles'
+            path.mkdir(exist_ok=True)
+            for name, profiler in _PROFILES['profilers'].items():
+                # dump_stats would disable profilers used by other threads
+                profiler.snapshot_stats()
+                with open(path / f"{name}.prof", "wb") as f:
+                    marshal.dump(profiler.stats, f)
+        except OSError as e:
+            warnings.warn(f"Could not write profiles: {e}", RuntimeWarning)
+
+
+@contextmanager
+def profiled(config: ConfigManager) -> Iterator[None]:
+    """
+    Profiles the work within the context with cProfile if profile_workers is set.
+
+    Every worker process accumulates its own profile, and every thread before Python 3.12. Profiles are
+    written to outpath/profiles at most every PROFILE_DUMP_INTERVAL seconds, by dump_profiles at the end of
+    a download and after every tile group of a pool worker, since those may be terminated without running
+    exit handlers. Profiling never fails the profiled work.
+    """
+    profiler = _start_profiler(config) if config.profile_workers else None
+    if profiler is None:
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        _stop_profiler(profiler)
+        if time.monotonic() - _PROFILES['dumped'] > PROFILE_DUMP_INTERVAL:
+            dump_profiles(config)
+
+
+def process_tile(task: TileTask, config: ConfigManager) -> Dict[str, Any]:
+    """Downloads a single tile and returns its state, recording failures per tile instead of raising."""
+    tile_state = create_state(task)
+    try:
+        tile_state = austriadownloader.download(tile_state, config, verbose=config.verbose)
+    except Exception as e:
+        tile_state.set_failed(e)
+    return tile_state.get_state()
+
+
+# Configuration of a pool worker, sent once per process by the pool initializer
+_WORKER_CONFIG: Optional[ConfigManager] = None
+
+
+def _init_worker(config: ConfigManager, processes: int = 1) -> None:
+    """Pool initializer storing the configuration in the worker process, one of processes sending requests."""
+    global _WORKER_CONFIG
+    _WORKER_CONFIG = config
+    configure_requests(config, processes)
+
+
+def configure_requests(config: ConfigManager, processes: int = 1) -> None:
+    """
+    Sets up the request scheduler of the current process with the configured retry and concurrency limits.
+
+    The limits are per process, so host_concurrency is split among the processes sending requests at the same
+    time, leaving at least one concurrent request per host to each.
+    """
+    configure_scheduler(max_retries=config.max_retries, backoff=config.retry_backoff,
+                        host_concurrency=max(1, config.host_concurrency // processes))
+
+
+def _process_group(tasks: List[TileTask]) -> List[Dict[str, Any]]:
+    """Handles downloading a chunk of tiles sharing a footprint in one worker, keeping its raster pool warm.
+    Args:
+        tasks (List[TileTask]): Consecutive tasks of the scheduled tiles.
+    Returns:
+        List[dict]: The download states of the tiles.
+    """
+    try:
+        with profiled(_WORKER_CONFIG):
+            prefetch_group(tasks, _WORKER_CONFIG)
+            try:
+                return [process_tile(task, _WORKER_CONFIG) for task in tasks]
+            finally:
+                clear_parcels()
+    finally:
+        if _WORKER_CONFIG.profile_workers:
+            dump_profiles(_WORKER_CONFIG)
+
+
+def _compute_tile(tile_state: DownloadState, fetched: TileFetch) -> Dict[str, Any]:
+    """Processes and writes the fetched data of a tile in a worker of the concurrent download method."""
+    try:
+        with profiled(_WORKER_CONFIG):
+            tile_state = compute_tile(tile_state, _WORKER_CONFIG, fetched)
+    except Exception as e:
+        tile_state.set_failed(e)
+    return tile_state.get_state()
+
+
+class TileJob:
+    """A tile travelling through the stages of the pipeline download method, holding its intermediate data."""
+
+    def __init__(self, task: TileTask, group: int, tasks: List[TileTask]):
+        self.state = create_state(task)
+        self.group = group  # index of the tile group, routing all its tiles to the same vector worker
+        self.tasks = tasks
+        self.done = False  # set once the remaining stages have nothing left to do
+
+        self.meta_data: Optional[pd.Series] = None
+        self.raster_tile = None
+        self.parcels = None
+        self.raster = None
+        self.raster_product = None
+        self.mask_product = None
+
+
+# Tile group whose parcels have been prefetched by the current vector worker thread
+_PREFETCHED_GROUP = threading.local()
+
+
+def _run_stage(job: TileJob, step, config: ConfigManager) -> TileJob:
+    """Applies a pipeline step to a tile, recording failures per tile instead of raising."""
+    if job.done:
+        return job
+    try:
+        with profiled(config):
+            step(job, config)
+    except Exception as e:
+        job.state.set_failed(e)
+        job.done = True
+    return job
+
+
+def _fetch_vector(job: TileJob, config: ConfigManager) -> None:
+    """Pipeline step resolving the footprint and raster window of a tile and reading its parcels."""
+    if getattr(_PREFETCHED_GROUP, 'group', None) != job.group:
+        _PREFETCHED_GROUP.group = job.group
+        prefetch_group(job.tasks, config)
+
+    with rio.Env(**config.gdal_env), vector_env(config.gdal_env):
+        with job.state.timed('metadata'):
+            job.meta_data = resolve_metadata(job.state)
+        if job.meta_data is None:
+            job.state.set_raster_failed()
+            job.state.set_vector_failed()
+            job.done = True
+            return
+
+        src, window, profile = locate_raster_window(job.state, config, job.meta_data)
+        job.raster_tile = describe_raster_tile(profile, window, src.transform, config)
+        with job.state.timed('vector_query'):
+            job.parcels = read_vector_data(job.state.vector_path or job.meta_data["vector_url"], config,
+                                           job.raster_tile)
+
+
+def _fetch_raster(job: TileJob, config: ConfigManager) -> None:
+    """Pipeline step reading the raster window of a tile."""
+    with rio.Env(**config.gdal_env):
+        job.raster = read_rasterdata(job.state, config, job.meta_data)
+
+
+def _compute(job: TileJob, config: ConfigManager) -> None:
+    """Pipeline step padding and resampling the raster and rasterizing the parcels of a tile."""
+    with job.state.timed('resample'):
+        job.raster_product = compute_raster_data(job.state, config, *job.raster)
+    job.raster = None
+    if job.raster_product is None:
+        job.done = True
+        return
+
+    try:
+        with job.state.timed('rasterize'):
+            job.mask_product = compute_mask_data(job.parcels, config, job.state, job.raster_tile)
+    except Exception:
+        job.state.set_vector_failed()
+        raise
+    job.parcels = None
+
+
+def _write(job: TileJob, config: ConfigManager) -> None:
+    """Pipeline step encoding and writing the raster and mask of a tile."""
+    with rio.Env(**config.gdal_env):
+        with job.state.timed('raster_write'):
+            save_raster_data(data=job.raster_product.data, profile=job.raster_product.profile, config=config,
+                             tile_state=job.state, transform=job.raster_product.transform)
+        try:
+            with job.state.timed('mask_write'):
+                write_mask_data(job.mask_product, config, job.state, job.raster_tile)
+        except Exception:
+            job.state.set_vector_failed()
+            raise
+    job.state.set_vector_successful()
+    job.raster_product, job.mask_product = None, None
+
+
+def tile_pipeline(config: ConfigManager) -> Pipeline:
+    """Builds the staged pipeline of the pipeline download method from the configured stage workers."""
+    workers = config.stage_workers
+    return Pipeline([
+        Stage('vector', partial(_run_stage, step=_fetch_vector, config=config), workers['vector'],
+              key=lambda job: job.group),
+        Stage('raster', partial(_run_stage, step=_fetch_raster, config=config), workers['raster']),
+        Stage('compute', partial(_run_stage, step=_compute, config=config), workers['compute']),
+        Stage('write', partial(_run_stage, step=_write, config=config), workers['write']),
+    ], queue_size=config.pipeline_queue_size)
 
 
 class DownloadManager(BaseModel):
     config: ConfigManager
-    state: pd.DataFrame = None # = Field(default_factory=lambda: pd.DataFrame(columns=('id', 'aerial', 'cadster', 'num_items', 'area_items', 'contains_nodata')))
-    #cols: Tuple[str, ...] = ('id', 'aerial', 'cadster', 'num_items', 'area_items')
     tiles: pd.DataFrame = None
 
     log: Dict = {}
 
+    _state_log: StateLog = PrivateAttr(default=None)
+    _completion_index: CompletionIndex = PrivateAttr(default=None)
+
     class Config:
         arbitrary_types_allowed = True  # Allows using non-Pydantic types like pd.DataFrame
         frozen = False  # Allows modifying attributes after initialization
@@ -43,17 +432,128 @@ class DownloadManager(BaseModel):
                           f"This will lead to unexpected behaviour if not corrected.")
         return data
 
+    @property
+    def state_log(self) -> StateLog:
+        """The streaming state log of the download, its columns derived from the configured labels."""
+        if self._state_log is None:
+            labels = self.config.mask_label if self.config.mask_remapping is None else sorted(set(self.config.mask_remapping.values()))
+            self._state_log = StateLog(pathlib.Path(self.config.outpath) / 'statelog.csv',
+                                       state_columns(labels, extended=self.config.extended_stats))
+        return self._state_log
+
+    @property
+    def completion_index(self) -> CompletionIndex:
+        """The journal of completed tiles in outpath, used to resume interrupted downloads."""
+        if self._completion_index is None:
+            self._completion_index = CompletionIndex(pathlib.Path(self.config.outpath) / 'completed.csv',
+                                                     self.config.config_hash)
+        return self._completion_index
+
+    @property
+    def state(self) -> pd.DataFrame | None:
+        """The state of all processed tiles, materialized from the state log on demand."""
+        return self.state_log.read()
+
     def add_row(self, new_data: dict):
         """
-        Adds a new row to the DataFrame. If it doesn't exist, it initializes it.
+        Appends a new row to the state log.
         :param new_data: Dictionary containing column names as keys and values as row data.
         """
-        new_row = pd.DataFrame([new_data])
+        self.state_log.write(new_data)
 
-        if self.state is None:
-            self.state = new_row
+        # failed tiles are retried by the next run
+        if new_data.get('error') is None:
+            self.completion_index.add(new_data['id'])
         else:
-            self.state = pd.concat([self.state, new_row], ignore_index=True)
+            self.log['Failed tiles'] = self.log.get('Failed tiles', 0) + 1
+
+    def skip_completed(self) -> None:
+        """Removes all tiles completed by a previous run with the same configuration from the tiles."""
+        if len(self.completion_index) == 0:
+            return
+
+        ids = self.tiles['id'].map(lambda v: DownloadState.validate_id(v))
+        self.tiles = self.tiles[~ids.isin(self.completion_index.completed)].reset_index(drop=True)
+
+    def open_logs(self) -> None:
+        """
+        Opens the state log and the completion journal, continuing an interrupted run if resume is set.
+
+        Both are only replaced if resume is turned off, the state log also keeps the rows of earlier runs
+        with another configuration.
+        """
+        if self.config.resume:
+            self.completion_index.load()
+            self.skip_completed()
+        self.completion_index.open(append=self.config.resume)
+        self.state_log.open(append=self.config.resume)
+
+    def match_tiles(self) -> None:
+        """Assigns the intersecting cadastral footprint to every tile in a single bulk pass."""
+        if self.tiles is None:
+            raise ValueError('Error: Download Data was not loaded.')
+
+        self.tiles['meta_index'] = match_cadastral(self.tiles['lon'].to_numpy(), self.tiles['lat'].to_numpy())
+
+    def plan_tiles(self) -> None:
+        """Matches all tiles to their footprint, schedules them and precomputes their raster window offsets."""
+        self.match_tiles()
+        self.schedule_tiles()
+
+        self.tiles['row_off'], self.tiles['col_off'], self.tiles['ortho_contains_nodata'] = plan_raster_windows(
+            self.tiles['lon'].to_numpy(), self.tiles['lat'].to_numpy(), self.tiles['meta_index'].to_numpy(), self.config
+        )
+        self.reject_nodata_tiles()
+        self.mirror_tiles()
+
+    def reject_nodata_tiles(self) -> None:
+        """Records tiles whose planned window contains NoData as removed without reading them, if nodata_mode is 'remove'."""
+        if self.config.nodata_mode != 'remove':
+            return
+
+        rejected = self.tiles['ortho_contains_nodata'].to_numpy(dtype=bool)
+        for task in tile_tasks(self.tiles[rejected]):
+            tile_state = create_state(task)
+            tile_state.set_raster_failed()
+            tile_state.set_vector_failed()
+            self.add_row(tile_state.get_state())
+
+        self.log['Rejected tiles'] = int(rejected.sum())
+        self.tiles = self.tiles[~rejected].reset_index(drop=True)
+
+    def schedule_tiles(self) -> None:
+        """Orders tiles by their matched footprint and along a Z-order curve within each footprint."""
+        x, y = transform_coordinates_array(self.tiles['lon'].to_numpy(), self.tiles['lat'].to_numpy(),
+                                           from_crs=WGS84, to_crs=AUSTRIA_CRS)
+        order = np.lexsort((morton_code(x, y), self.tiles['meta_index'].to_numpy()))
+        self.tiles = self.tiles.iloc[order].reset_index(drop=True)
+
+    def mirror_tiles(self) -> None:
+        """Mirrors the cadastral GeoPackages of all matched tiles to the local cache, optionally extracting the tile extents."""
+        if self.config.cadastral_cache is None:
+            return
+
+        matched = self.tiles[self.tiles['meta_index'] >= 0]
+        vector_urls = get_cadastral_data()['vector_url'].to_numpy()[matched['meta_index'].to_numpy()]
+
+        self.tiles['vector_path'] = None
+        for url in pd.unique(vector_urls):
+            group = matched[vector_urls == url]
+            local_path = mirror_cadastral(url, self.config.cadastral_cache, verbose=self.config.verbose)
+            if self.config.cadastral_extract:
+                extents = tile_extents(group['lon'].to_numpy(), group['lat'].to_numpy(), self.config)
+                local_path = extract_cadastral(local_path, extents, self.config.cadastral_cache)
+            self.tiles.loc[group.index, 'vector_path'] = str(local_path)
+
+    def tile_groups(self) -> List[List[TileTask]]:
+        """Splits the tiles into chunks of consecutive tiles sharing a footprint, at most SCHEDULE_CHUNK_SIZE long."""
+        keys = self.tiles['meta_index'] if 'meta_index' in self.tiles else pd.Series(0, index=self.tiles.index)
+
+        groups = []
+        for _, group in self.tiles.groupby(keys, sort=False):
+            tasks = tile_tasks(group)
+            groups.extend(tasks[i:i + SCHEDULE_CHUNK_SIZE] for i in range(0, len(tasks), SCHEDULE_CHUNK_SIZE))
+        return groups
 
     def start_download(self):
         """Initiates the download process based on the specified method in the configuration."""
@@ -66,29 +566,64 @@ class DownloadManager(BaseModel):
             # add logging info
             self.log['Start Time'] = datetime.datetime.now()
             self.log['Errors'] = None
+            self.log['Failed tiles'] = 0
+
+            self.open_logs()
+
+            configure_requests(self.config)
+
+            # resolve meta data and raster windows for all tiles before downloading
+            self.plan_tiles()
 
             if self.config.download_method == 'sequential':
                 self.download_sequential()
             elif self.config.download_method == 'parallel':
                 self.download_parallel()
+            elif self.config.download_method == 'concurrent':
+                self.download_concurrent()
+            elif self.config.download_method == 'pipeline':
+                self.download_pipeline()
         except Exception as e:
-            self.log['Errors'] = e
+            self.log['Errors'] = str(e)
             self.end_of_download()
             print(f"Error downloading tiles: {e}")
 
     def end_of_download(self):
+        # release pooled raster datasets of the main process
+        close_rasters()
+        if self.config.profile_workers:
+            dump_profiles(self.config)
+
         # save downlaod log
         self.log['End Time'] = datetime.datetime.now()
         self.log['Duration'] = str(self.log['End Time'] - self.log['Start Time'])
         self.log['Number of Processed tiles'] = len(self.tiles)
+        self.state_log.flush()
+        state = self.state  # materialized once from the state log
+        self.log['Stage timings'] = stage_summary(state)
+        self.log['Raster bytes read'] = int(state['raster_bytes'].sum()) \
+            if state is not None and 'raster_bytes' in state else 0
+        self.write_log()
+
+        # The state log has been written continuously
+        self.state_log.close()
+        self.completion_index.close()
 
+        return
+
+    def write_log(self) -> None:
+        """Writes the download log to log.yml in the output folder."""
         with open(pathlib.Path(self.config.config_data['outpath']) / 'log.yml', "w") as f:
             yaml.safe_dump(self.log, f, sort_keys=False)
 
-        # Save the state log
-        self.state.to_csv(f'{self.config.outpath}/statelog.csv', index=False)
+    def checkpoint(self, processed: int) -> None:
+        """Forces the state log and completion journal to disk and records the progress in the download log."""
+        self.state_log.flush()
+        self.completion_index.flush()
 
-        return
+        self.log['Checkpoint Time'] = datetime.datetime.now()
+        self.log['Number of Processed tiles'] = processed
+        self.write_log()
 
     def download_sequential(self) -> None:
         """Downloads tiles sequentially, ensuring each tile is processed one at a time.
@@ -98,62 +633,191 @@ class DownloadManager(BaseModel):
         if self.tiles is None:
             raise ValueError('Error: Download Data was not loaded.')
 
-        for i, row in tqdm(self.tiles.iterrows()):
-            tile_state = DownloadState(id=row.id, lat=row.lat, lon=row.lon)
+        with tqdm(total=len(self.tiles)) as pbar:
+            for group in self.tile_groups():
+                prefetch_group(group, self.config)
 
-            # if file is already downloaded, skip it
-            if os.path.exists(f'{self.config.outpath}/input_{tile_state.id}.tif') and os.path.exists(f'{self.config.outpath}/target_{tile_state}.tif'):
-                continue
+                for task in group:
+                    pbar.update(1)
+                    tile_state = create_state(task)
 
-            download = austriadownloader.download(tile_state, self.config, verbose=self.config.verbose)
-            self.add_row(download.get_state())
+                    # if tile is already downloaded, skip it
+                    if tile_state.id in self.completion_index:
+                        continue
 
-            # save every 100 steps
-            if i % 100 == 0:
-                self.state.to_csv(f'{self.config.outpath}/statelog.csv', index=False)
+                    # failures are recorded per tile, transient ones have been retried by the request scheduler
+                    with profiled(self.config):
+                        state = process_tile(task, self.config)
+                    self.add_row(state)
+
+        clear_parcels()
 
         self.end_of_download()
         return
 
-    def _parallel(self, row: pd.Series) -> Tuple[str, Dict[str, any] | None]:
-        """Handles downloading a single tile in parallel processing mode.
-        Args:
-            row (pd.Series): A row from the tile dataset containing tile information.
-        Returns:
-            Tuple[str, Optional[dict]]: The tile ID and its download state if successful, otherwise None.
+    def download_parallel(self) -> None:
+        """Downloads tiles in parallel using multiprocessing for improved performance.
+        Raises:
+            ValueError: If no tile data is loaded before initiating the download.
         """
-        tile_state = DownloadState(id=row.id, lat=row.lat, lon=row.lon)
+        if self.tiles is None:
+            raise ValueError('Error: Download Data was not loaded.')
 
-        # if file is already downloaded, skip it
-        if os.path.exists(f'{self.config.outpath}/input_{tile_state.id}.tif') and os.path.exists(
-                f'{self.config.outpath}/target_{tile_state}.tif'):
-            return tile_state.id, None
+        if self.config.verbose:
+            print("Verbosity with parallel loading will result in no pretty-prints as outputs are created by pooled download requests.")
 
-        download = austriadownloader.download(tile_state, self.config, verbose=self.config.verbose)
+        # Hand chunks of tiles sharing a footprint to the workers
+        groups = self.tile_groups()
 
-        return download.id, download.get_state()
+        # Forked workers inherit the footprint table instead of loading it themselves
+        get_cadastral_data()
 
-    def download_parallel(self) -> None:
-        """Downloads tiles in parallel using multiprocessing for improved performance.
+        # The config is sent once per worker, tasks only carry the compact tile descriptions. Every worker reads
+        # remote data, so they share the per-host request limit.
+        processes = self.config.cpu_workers or os.cpu_count()
+        processed = 0
+        with Pool(processes=processes, initializer=_init_worker, initargs=(self.config, processes)) as pool, \
+                tqdm(total=len(self.tiles), desc="Processing") as pbar:
+            # Update manager state as results arrive
+            for group_results in pool.imap_unordered(_process_group, groups):
+                for state in group_results:
+                    self.add_row(state)
+
+                pbar.update(len(group_results))
+                if (processed + len(group_results)) // CHECKPOINT_INTERVAL > processed // CHECKPOINT_INTERVAL:
+                    self.checkpoint(processed + len(group_results))
+                processed += len(group_results)
+
+        self.end_of_download()
+        return
+
+    def download_concurrent(self) -> None:
+        """Downloads tiles by reading remote data on a thread pool and processing it on a process pool.
+
+        Window and parcel reads are I/O-bound and run on io_workers threads (by default one per concurrent
+        request the host limit allows), one tile group per thread, so many HTTP requests are in flight at once. Padding, resampling, rasterization and encoding are CPU-bound
+        and run on cpu_workers processes. At most two fetched tiles per process are buffered, readers wait
+        for free slots otherwise.
         Raises:
             ValueError: If no tile data is loaded before initiating the download.
         """
         if self.tiles is None:
             raise ValueError('Error: Download Data was not loaded.')
 
-        if self.config.verbose:
-            print("Verbosity with parallel loading will result in no pretty-prints as outputs are created by pooled download requests.")
+        # Forked workers inherit the footprint table instead of loading it themselves
+        get_cadastral_data()
+
+        cpu_workers = self.config.cpu_workers or os.cpu_count()
+        slots = threading.BoundedSemaphore(2 * cpu_workers)
+        results: queue.Queue = queue.Queue()
+        stop = threading.Event()  # set once the download is aborted
+
+        def computed(tile_state: DownloadState, future: Future) -> None:
+            slots.release()
+            try:
+                results.put(future.result())
+            except Exception as e:
+                # the worker process itself failed, e.g. on unpicklable data
+                tile_state.set_failed(e)
+                results.put(tile_state.get_state())
+
+        def fetch_group(tasks: List[TileTask], cpu_pool: ProcessPoolExecutor) -> None:
+            if stop.is_set():
+                return
+            prefetch_group(tasks, self.config)
+
+            try:
+                for task in tasks:
+                    if stop.is_set():
+                        return
+                    tile_state = create_state(task)
+                    try:
+                        with profiled(self.config):
+                            fetched = fetch_tile(tile_state, self.config)
+                    except Exception as e:
+                        tile_state.set_failed(e)
+                        fetched = None
+
+                    if fetched is None:
+                        results.put(tile_state.get_state())
+                        continue
+
+                    while not slots.acquire(timeout=1):
+                        if stop.is_set():
+                            return
+                    try:
+                        future = cpu_pool.submit(_compute_tile, tile_state, fetched)
+                    except BaseException:
+                        # e.g. a broken process pool, the slot is never released by computed
+                        slots.release()
+                        raise
+                    future.add_done_callback(lambda f, ts=tile_state: computed(ts, f))
+            except BaseException:
+                # the error aborts the download, other readers stop before their next read
+                stop.set()
+                raise
+            finally:
+                clear_parcels()
+
+        processed = 0
+        with ProcessPoolExecutor(max_workers=cpu_workers, initializer=_init_worker, initargs=(self.config,)) as cpu_pool, \
+                ThreadPoolExecutor(max_workers=self.config.io_workers or self.config.host_concurrency) as io_pool, \
+                tqdm(total=len(self.tiles), desc="Processing") as pbar:
+            # Forked workers start at the first submit, which must not happen on a reader thread while others
+            # hold GDAL or curl locks, as the children would inherit them locked. Start all of them up front.
+            cpu_pool.submit(os.getpid).result()
+            fetches = [io_pool.submit(fetch_group, group, cpu_pool) for group in self.tile_groups()]
+
+            # Update manager state as results arrive
+            try:
+                while processed < len(self.tiles):
+                    try:
+                        state = results.get(timeout=1)
+                    except queue.Empty:
+                        # surface errors of the readers, which would otherwise leave tiles missing
+                        for fetch in fetches:
+                            if fetch.done() and fetch.exception() is not None:
+                                raise fetch.exception()
+                        continue
+
+                    self.add_row(state)
+                    processed += 1
+                    pbar.update(1)
+                    if processed % CHECKPOINT_INTERVAL == 0:
+                        self.checkpoint(processed)
+            except BaseException:
+                # no further remote reads for results that would never be logged
+                stop.set()
+                io_pool.shutdown(wait=False, cancel_futures=True)
+                raise
 
-        # Extract rows as dictionaries for easier parallel processing
-        rows = [row for _, row in self.tiles.iterrows()]
+        self.end_of_download()
+        return
 
-        with Pool(processes=os.cpu_count()) as pool:
-            results = list(tqdm(pool.imap_unordered(self._parallel, rows), total=len(rows), desc="Processing"))
+    def download_pipeline(self) -> None:
+        """Downloads tiles through a staged pipeline of threads connected by bounded queues.
+
+        Parcel reads, raster window reads, processing and encoding run as separate stages with their own
+        number of threads (pipeline_workers), so slow DEFLATE encoding overlaps with network reads. At most
+        pipeline_queue_size tiles wait between two stages, keeping memory bounded on large runs.
+        Raises:
+            ValueError: If no tile data is loaded before initiating the download.
+        """
+        if self.tiles is None:
+            raise ValueError('Error: Download Data was not loaded.')
 
-        # Update manager state after parallel processing
-        for tile_id, state in results:
-            if state:  # If state is not None, update the manager
-                self.add_row(state)
+        groups = self.tile_groups()
+        jobs = (TileJob(task, index, group) for index, group in enumerate(groups) for task in group)
+
+        processed = 0
+        with tqdm(total=len(self.tiles), desc="Processing") as pbar:
+            # Update manager state as tiles leave the last stage
+            for job in tile_pipeline(self.config).run(jobs):
+                self.add_row(job.state.get_state())
+                processed += 1
+                pbar.update(1)
+                if processed % CHECKPOINT_INTERVAL == 0:
+                    self.checkpoint(processed)
 
         self.end_of_download()
         return
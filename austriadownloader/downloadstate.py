@@ -1,17 +1,103 @@
-from typing import Dict
+import csv
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple, List, Iterable, Any, Set, Iterator
+
+import pandas as pd
 from pydantic import BaseModel, field_validator
 
+BASE_STATE_COLUMNS: Tuple[str, ...] = ('id', 'aerial', 'cadaster', 'ortho_contains_nodata', 'error')
+
+# Timed processing stages of a tile, logged as time_<stage> in seconds
+TIMING_STAGES: Tuple[str, ...] = ('metadata', 'raster_open', 'raster_read', 'resample', 'raster_write',
+                                  'vector_query', 'rasterize', 'mask_write')
+
+
+def state_columns(labels: Iterable[int], extended: bool = False) -> List[str]:
+    """Returns the fixed column order of the state log for the given pixel labels."""
+    labels = list(labels)
+    columns = [*BASE_STATE_COLUMNS, 'dist_0', *(f'dist_{k}' for k in labels), *(f'count_{k}' for k in labels),
+               *(f'time_{stage}' for stage in TIMING_STAGES), 'raster_bytes']
+    if extended:
+        columns += [*(f'bbox_{k}' for k in labels), *(f'edges_{k}' for k in labels)]
+    return columns
+
+
+class StateLog:
+    """Append-only CSV log of tile states, written and flushed line by line."""
+
+    def __init__(self, path: Path | str, columns: List[str]):
+        self.path = Path(path)
+        self.columns = columns
+        self._file = None
+        self._writer = None
+
+    def open(self, append: bool = False) -> "StateLog":
+        """
+        Opens the log file, continuing an existing log if append is set and replacing it otherwise.
+
+        An existing log with other columns, e.g. written with other labels, is replaced as well.
+        """
+        if append and self.path.exists():
+            with open(self.path, "r", newline="") as f:
+                append = next(csv.reader(f), None) == self.columns
+        write_header = not (append and self.path.exists())
+        self._file = open(self.path, "a" if append else "w", newline="", buffering=1)
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, restval='', extrasaction='ignore')
+        if write_header:
+            self._writer.writeheader()
+        return self
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Appends a single state record."""
+        if self._writer is None:
+            self.open()
+        self._writer.writerow(record)
+
+    def flush(self) -> None:
+        """Forces all logged states to disk."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Closes the log file."""
+        if self._file is not None:
+            self._file.close()
+        self._file, self._writer = None, None
+
+    def read(self) -> pd.DataFrame | None:
+        """Materializes the log as a DataFrame, None if nothing has been logged."""
+        if not self.path.exists():
+            return None
+        # a tile interrupted between logging and completion is logged again on resume
+        return pd.read_csv(self.path).drop_duplicates(subset='id', keep='last').reset_index(drop=True)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # open file handles stay with the process owning the log
+        return {**self.__dict__, '_file': None, '_writer': None}
+
 
 class DownloadState(BaseModel):
     id: str | int | float
     lat: float
     lon: float
+    meta_index: int | None = None  # positional index into AUSTRIA_CADASTRAL, -1 if unmatched
+    window_offset: Tuple[int, int] | None = None  # planned (row, col) offset of the raster window
+    vector_path: str | None = None  # local copy of the cadastral GeoPackage, if mirrored
 
     class_distributions: Dict[int, float] = {}
     class_instance_count: Dict[int, int] = {}
+    class_bboxes: Dict[int, Tuple[int, int, int, int] | None] = {}  # (row_min, col_min, row_max, col_max)
+    class_edge_pixels: Dict[int, int] = {}
+    stage_timings: Dict[str, float] = {}  # seconds spent per stage of TIMING_STAGES
+    raster_bytes: int = 0  # decoded bytes of all raster windows read
     ortho_contains_nodata: bool = False
     raster_download_success: bool = False
     vector_download_success: bool = False
+    error: str | None = None
 
     class Config:
         # This ensures that the model is mutable after initialization (default behavior)
@@ -28,7 +114,8 @@ class DownloadState(BaseModel):
             'id': self.id,
             'aerial': self.raster_download_success,
             'cadaster': self.vector_download_success,
-            'ortho_contains_nodata': self.ortho_contains_nodata
+            'ortho_contains_nodata': self.ortho_contains_nodata,
+            'error': self.error
         }
 
         for kd, vd in self.class_distributions.items():
@@ -37,8 +124,40 @@ class DownloadState(BaseModel):
         for kc, vc in self.class_instance_count.items():
             base[f'count_{kc}'] = vc
 
+        for kb, vb in self.class_bboxes.items():
+            base[f'bbox_{kb}'] = vb
+
+        for ke, ve in self.class_edge_pixels.items():
+            base[f'edges_{ke}'] = ve
+
+        for ks, vs in self.stage_timings.items():
+            base[f'time_{ks}'] = round(vs, 6)
+        base['raster_bytes'] = self.raster_bytes
+
         return base
 
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """Adds the wall time spent within the context to the timing of a processing stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_timings[stage] = self.stage_timings.get(stage, 0.0) + time.perf_counter() - start
+
+    def set_failed(self, error: Exception):
+        """Records an error which aborted processing the tile."""
+        self.error = str(error)
+
+    def check_failed(self) -> bool:
+        """
+        Checks if processing the tile was aborted by an error.
+
+        Returns:
+            bool: True if an error was recorded, False otherwise.
+        """
+        return self.error is not None
+
     def set_raster_failed(self):
         """Marks the raster download as failed."""
         self.raster_download_success = False
@@ -72,3 +191,64 @@ class DownloadState(BaseModel):
             bool: True if vector download was successful, False otherwise.
         """
         return self.vector_download_success
+
+
+class CompletionIndex:
+    """Append-only journal of completed tiles keyed by tile id and config hash, held as a set in memory."""
+
+    def __init__(self, path: Path | str, config_hash: str):
+        self.path = Path(path)
+        self.config_hash = config_hash
+        self.completed: Set[str] = set()
+        self._file = None
+
+    def load(self) -> Set[str]:
+        """Loads the ids of all tiles completed with the current config hash."""
+        self.completed = set()
+        if self.path.exists():
+            with open(self.path, "r", newline="") as f:
+                for line in f:
+                    # skip a partially written last line, its id may be truncated
+                    if not line.endswith("\n"):
+                        continue
+                    # skip lines of other configurations
+                    fields = next(csv.reader([line]))
+                    if len(fields) == 2 and fields[0] == self.config_hash:
+                        self.completed.add(fields[1])
+        return self.completed
+
+    def open(self, append: bool = True) -> "CompletionIndex":
+        """Opens the journal, continuing it if append is set and replacing it otherwise."""
+        if not append:
+            self.completed = set()
+        self._file = open(self.path, "a" if append else "w", newline="", buffering=1)
+        return self
+
+    def add(self, tile_id: str) -> None:
+        """Marks a tile as completed."""
+        if self._file is None:
+            self.open()
+        self._file.write(f"{self.config_hash},{tile_id}\n")
+        self.completed.add(tile_id)
+
+    def flush(self) -> None:
+        """Forces all completions to disk."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Closes the journal file."""
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+
+    def __contains__(self, tile_id: object) -> bool:
+        return tile_id in self.completed
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # open file handles stay with the process owning the journal
+        return {**self.__dict__, '_file': None}
@@ -0,0 +1,118 @@
+"""
+Module for running items through a chain of thread-backed stages connected by bounded queues.
+
+Every stage has its own number of worker threads. Queues between stages hold at most queue_size items, so
+a slow stage blocks the stages feeding it instead of letting work pile up in memory, and stages waiting on
+different resources (network, CPU, disk) overlap.
+"""
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+# Marks the end of the input of a stage worker
+_STOP: object = object()
+
+
+class Stage(NamedTuple):
+    """A processing step applied to every item by its own worker threads."""
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    # routes all items of one key to the same worker, e.g. to keep worker-local caches warm
+    key: Optional[Callable[[Any], int]] = None
+
+
+class Pipeline:
+    """Chain of stages connected by bounded queues, items leave the last stage in completion order."""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 32):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Feed items through all stages and yield them as they leave the last stage.
+
+        Stage functions return the item handed to the next stage and are expected to handle their own errors.
+        An exception escaping a stage function aborts the pipeline: all queued items are discarded and the
+        exception is raised once every worker has stopped.
+
+        Args:
+            items: Items to process, consumed lazily.
+
+        Yields:
+            The items returned by the last stage.
+        """
+        inboxes = [self._inboxes(stage) for stage in self.stages]
+        outbox: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+        errors: List[BaseException] = []
+
+        def put(index: int, item: Any) -> None:
+            if index == len(self.stages):
+                outbox.put(item)
+                return
+            stage, boxes = self.stages[index], inboxes[index]
+            boxes[stage.key(item) % len(boxes) if stage.key is not None else 0].put(item)
+
+        def stop(index: int) -> None:
+            # every worker of the next stage receives its own stop marker
+            if index == len(self.stages):
+                outbox.put(_STOP)
+                return
+            boxes = inboxes[index]
+            for worker in range(self.stages[index].workers):
+                boxes[worker % len(boxes)].put(_STOP)
+
+        def work(index: int, inbox: queue.Queue) -> None:
+            func = self.stages[index].func
+            try:
+                while (item := inbox.get()) is not _STOP:
+                    if errors:
+                        # drain the queue, so no upstream worker blocks on it
+                        continue
+                    try:
+                        put(index + 1, func(item))
+                    except BaseException as e:
+                        errors.append(e)
+            finally:
+                with lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                if last:
+                    stop(index + 1)
+
+        def feed() -> None:
+            try:
+                for item in items:
+                    if errors:
+                        break
+                    put(0, item)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                stop(0)
+
+        threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.workers):
+                inbox = inboxes[index][worker % len(inboxes[index])]
+                threads.append(threading.Thread(target=work, args=(index, inbox), name=f"pipeline-{stage.name}-{worker}",
+                                                daemon=True))
+        for thread in threads:
+            thread.start()
+
+        while (item := outbox.get()) is not _STOP:
+            yield item
+
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def _inboxes(self, stage: Stage) -> List[queue.Queue]:
+        """Input queues of a stage, one per worker if items are routed by key and a shared one otherwise."""
+        if stage.key is None:
+            return [queue.Queue(maxsize=self.queue_size)]
+        return [queue.Queue(maxsize=max(1, self.queue_size // stage.workers)) for _ in range(stage.workers)]
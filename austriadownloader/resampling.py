@@ -0,0 +1,122 @@
+"""
+Module for resampling raster tiles to the configured resample_size.
+
+Every engine operates on the whole (C, H, W) stack at once and writes into a preallocated output array:
+
+- 'pil': Pillow LANCZOS, resizing three uint8 bands per call as one RGB image.
+- 'numpy': separable Lanczos-3 kernel applied as two matrix products, for any numeric dtype.
+- 'gdal': GDAL resampling with any of RESAMPLING_METHODS. Tiles are then resampled while reading the window from
+  the nearest overview (see download.py), this in-memory variant is used for data read at native resolution.
+"""
+from functools import lru_cache
+from typing import Final, Tuple
+
+import numpy as np
+from PIL import Image
+from rasterio.transform import Affine
+from rasterio.warp import reproject, Resampling
+
+# Constants
+RESAMPLE_ENGINES: Final = ('pil', 'numpy', 'gdal')
+RESAMPLING_METHODS: Final = ('nearest', 'bilinear', 'cubic', 'cubic_spline', 'lanczos', 'average', 'mode')
+LANCZOS_SUPPORT: Final[int] = 3
+
+# Any planar CRS, in-memory resampling only relates the pixel grids
+_PIXEL_CRS: Final[str] = "EPSG:3857"
+
+
+def resample(
+        data: np.ndarray,
+        size: Tuple[int, int],
+        engine: str = 'pil',
+        out: np.ndarray | None = None,
+        method: str = 'lanczos'
+) -> np.ndarray:
+    """
+    Resample a (C, H, W) array to (C, height, width).
+
+    Args:
+        data: Input array.
+        size: Target (height, width).
+        engine: One of RESAMPLE_ENGINES.
+        out: Optional preallocated output array of shape (C, height, width) and the dtype of data.
+        method: One of RESAMPLING_METHODS, the 'pil' and 'numpy' engines only support 'lanczos'.
+
+    Returns:
+        np.ndarray: The resampled array, out if given.
+
+    Raises:
+        ValueError: If the engine is unknown or does not support the method.
+    """
+    if method != 'lanczos' and engine != 'gdal':
+        raise ValueError(f"Resampling method {method} requires the 'gdal' engine")
+    if out is None:
+        out = np.empty((data.shape[0], *size), dtype=data.dtype)
+
+    if engine == 'pil':
+        _resample_pil(data, out)
+    elif engine == 'numpy':
+        _resample_numpy(data, out)
+    elif engine == 'gdal':
+        _resample_gdal(data, out, method)
+    else:
+        raise ValueError(f"Invalid resampling engine: {engine}. Must be one of {RESAMPLE_ENGINES}")
+    return out
+
+
+def _resample_pil(data: np.ndarray, out: np.ndarray) -> None:
+    """Resize with Pillow LANCZOS, three uint8 bands at a time and remaining bands one by one."""
+    size = (out.shape[2], out.shape[1])
+    band = 0
+    while band < data.shape[0]:
+        if data.dtype == np.uint8 and data.shape[0] - band >= 3:
+            image = Image.fromarray(np.ascontiguousarray(np.moveaxis(data[band:band + 3], 0, -1)), mode='RGB')
+            out[band:band + 3] = np.moveaxis(np.asarray(image.resize(size, resample=Image.Resampling.LANCZOS)), -1, 0)
+            band += 3
+        else:
+            out[band] = np.asarray(Image.fromarray(data[band]).resize(size, resample=Image.Resampling.LANCZOS))
+            band += 1
+
+
+@lru_cache(maxsize=16)
+def lanczos_matrix(n_in: int, n_out: int) -> np.ndarray:
+    """
+    Get the (n_out, n_in) Lanczos-3 weight matrix resampling one axis, antialiased when downsampling.
+
+    Weights are normalized per output pixel and taps outside the input are dropped.
+    """
+    scale = n_in / n_out
+    filter_scale = max(scale, 1.0)
+    support = LANCZOS_SUPPORT * filter_scale
+
+    centers = (np.arange(n_out) + 0.5) * scale
+    taps = np.floor(centers - support + 0.5).astype(int)[:, None] + np.arange(int(np.ceil(support)) * 2 + 1)
+    x = (taps + 0.5 - centers[:, None]) / filter_scale
+    weights = np.sinc(x) * np.sinc(x / LANCZOS_SUPPORT)
+    weights[(np.abs(x) >= LANCZOS_SUPPORT) | (taps < 0) | (taps >= n_in)] = 0
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    matrix = np.zeros((n_out, n_in), dtype=np.float32)
+    rows = np.repeat(np.arange(n_out), taps.shape[1])
+    np.add.at(matrix, (rows, np.clip(taps, 0, n_in - 1).ravel()), weights.ravel())
+    return matrix
+
+
+def _resample_numpy(data: np.ndarray, out: np.ndarray) -> None:
+    """Apply the separable Lanczos kernel along both axes of all bands with two matrix products."""
+    rows = lanczos_matrix(data.shape[1], out.shape[1])
+    cols = lanczos_matrix(data.shape[2], out.shape[2])
+    result = np.matmul(rows, data.astype(np.float32) @ cols.T)
+
+    if np.issubdtype(out.dtype, np.integer):
+        info = np.iinfo(out.dtype)
+        result = np.clip(np.rint(result), info.min, info.max)
+    np.copyto(out, result, casting='unsafe')
+
+
+def _resample_gdal(data: np.ndarray, out: np.ndarray, method: str) -> None:
+    """Resample with GDAL by warping between two pixel grids of the same extent."""
+    reproject(source=data, destination=out,
+              src_transform=Affine.identity(), src_crs=_PIXEL_CRS,
+              dst_transform=Affine.scale(data.shape[2] / out.shape[2], data.shape[1] / out.shape[1]),
+              dst_crs=_PIXEL_CRS, resampling=Resampling[method])
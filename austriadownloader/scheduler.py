@@ -0,0 +1,204 @@
+"""
+Module for scheduling remote requests against the BEV servers.
+
+Every remote raster or vector request runs through the process-wide RequestScheduler. It limits the
+number of concurrent requests per host and adapts this limit to the server's capacity (additive increase,
+multiplicative decrease on transient errors and sustained latency increases). Requests failing with a
+transient HTTP or GDAL error are retried with exponential backoff and full jitter. Bulk transfers, such as
+whole GeoPackage downloads, share the concurrency limit but are kept out of the latency signal.
+"""
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+from typing import Any, Callable, Dict, Final, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Constants
+TRANSIENT_HTTP_CODES: Final = (408, 429, 500, 502, 503, 504)
+# TLS failures are only transient if the connection broke, certificate errors are permanent
+TRANSIENT_MESSAGES: Final = ('timed out', 'timeout', 'connection reset', 'connection refused', 'connection aborted',
+                             'failed to connect', 'could not connect', 'temporarily unavailable', 'could not resolve',
+                             "couldn't resolve", 'unexpected eof', 'eof occurred in violation of protocol',
+                             'ssl_error_syscall')
+MAX_BACKOFF: Final[float] = 30.0  # seconds
+LATENCY_TOLERANCE: Final[float] = 3.0  # latencies above this multiple of the baseline count as slow
+SLOW_SAMPLES: Final[int] = 3  # consecutive slow requests signalling congestion
+BASELINE_GROWTH: Final[float] = 1.01  # per request, lets the baseline follow a lasting slowdown of the server
+DECREASE_FACTOR: Final[float] = 0.5
+
+_HTTP_CODE = re.compile(r"\b(\d{3})\b")
+
+
+def is_transient(error: BaseException) -> bool:
+    """Check whether a failed request is worth retrying, e.g. on timeouts or HTTP 429 and 5xx responses."""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in TRANSIENT_HTTP_CODES
+    if isinstance(error, (TimeoutError, ConnectionError, urllib.error.URLError)):
+        return True
+
+    # rasterio and pyogrio only expose the GDAL/CURL error message
+    message = str(error).lower()
+    if 'http' in message and any(int(code) in TRANSIENT_HTTP_CODES for code in _HTTP_CODE.findall(message)):
+        return True
+    return any(m in message for m in TRANSIENT_MESSAGES)
+
+
+class HostLimiter:
+    """Adaptive limit of concurrent requests to a single host."""
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = float(max(1, max_limit // 2))
+        self.active = 0
+        self.latency: Optional[float] = None  # moving average of successful requests in seconds
+        self.baseline: Optional[float] = None  # decaying minimum of successful requests in seconds
+        self._slow = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Wait until a request to the host may be started."""
+        with self._condition:
+            while self.active >= int(self.limit):
+                self._condition.wait()
+            self.active += 1
+
+    def release(self, latency: Optional[float], congested: bool) -> None:
+        """
+        Mark a request as finished and adapt the limit.
+
+        Args:
+            latency: Duration of a successful request in seconds, None if it failed or is a bulk transfer.
+            congested: The request failed with a transient error.
+        """
+        with self._condition:
+            self.active -= 1
+            if latency is not None:
+                congested = self._observe(latency)
+            if congested:
+                # decrease at most once per average round trip, a burst of failures is one congestion event
+                now = time.monotonic()
+                if now - self._last_decrease > (self.latency or 0.0):
+                    self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+            elif latency is not None:
+                # grows by about one request per round trip at full use
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _observe(self, latency: float) -> bool:
+        """Add the latency of a successful request to the averages, True if the server is congested."""
+        self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+        self.baseline = latency if self.baseline is None else min(latency, self.baseline * BASELINE_GROWTH)
+
+        # single slow requests are expected, only a run of them indicates congestion
+        self._slow = self._slow + 1 if latency > LATENCY_TOLERANCE * self.baseline else 0
+        if self._slow < SLOW_SAMPLES:
+            return False
+        self._slow = 0
+        return True
+
+
+class RequestScheduler:
+    """Runs remote requests with per-host adaptive concurrency limits and retries on transient errors."""
+
+    def __init__(self, max_retries: int = 5, backoff: float = 0.5, host_concurrency: int = 8):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.host_concurrency = host_concurrency
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, host: str) -> HostLimiter:
+        """Get the limiter of a host, creating it on first use."""
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = HostLimiter(self.host_concurrency)
+            return self._limiters[host]
+
+    def call(self, url: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a request to url, retrying it on transient errors.
+
+        Args:
+            url: Resource accessed by the request, local paths are run directly.
+            func: Function performing the request.
+            *args: Positional arguments of func.
+            **kwargs: Keyword arguments of func.
+
+        Returns:
+            The result of func.
+
+        Raises:
+            Exception: The error of the last attempt, or the first error if it is not transient.
+        """
+        return self._call(url, func, args, kwargs, bulk=False)
+
+    def call_bulk(self, url: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a bulk transfer to url like call, without using its duration as latency signal."""
+        return self._call(url, func, args, kwargs, bulk=True)
+
+    def _call(self, url: str, func: Callable[..., T], args: Tuple[Any, ...], kwargs: Dict[str, Any], bulk: bool) -> T:
+        """Run a request with retries, see call."""
+        host = urllib.parse.urlparse(str(url).removeprefix('/vsicurl/')).netloc
+        if not host:
+            return func(*args, **kwargs)
+
+        limiter = self.limiter(host)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            start, latency, congested = time.monotonic(), None, False
+            try:
+                result = func(*args, **kwargs)
+                if not bulk:
+                    latency = time.monotonic() - start
+                return result
+            except Exception as e:
+                congested = is_transient(e)
+                if not congested or attempt == self.max_retries:
+                    raise
+            finally:
+                limiter.release(latency, congested)
+
+            # exponential backoff with full jitter, so retrying workers do not hit the server in lockstep
+            time.sleep(random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt)))
+
+
+# Scheduler of the current process, see get_scheduler
+_SCHEDULER: Dict[int, RequestScheduler] = {}
+_SCHEDULER_LOCK: Final[threading.Lock] = threading.Lock()
+
+
+def configure_scheduler(max_retries: int = 5, backoff: float = 0.5, host_concurrency: int = 8) -> RequestScheduler:
+    """Replace the scheduler of the current process with one using the given settings."""
+    _SCHEDULER[os.getpid()] = RequestScheduler(max_retries, backoff, host_concurrency)
+    return _SCHEDULER[os.getpid()]
+
+
+def get_scheduler() -> RequestScheduler:
+    """Get the scheduler of the current process, limits are not shared with forked worker processes."""
+    scheduler = _SCHEDULER.get(os.getpid())
+    if scheduler is None:
+        with _SCHEDULER_LOCK:
+            scheduler = _SCHEDULER.get(os.getpid())
+            if scheduler is None:
+                # forked workers keep the settings of their parent
+                parent = next(iter(_SCHEDULER.values()), None)
+                scheduler = configure_scheduler() if parent is None else \
+                    configure_scheduler(parent.max_retries, parent.backoff, parent.host_concurrency)
+    return scheduler
+
+
+def request(url: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a remote request through the scheduler of the current process."""
+    return get_scheduler().call(url, func, *args, **kwargs)
+
+
+def bulk_request(url: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a remote bulk transfer through the scheduler of the current process."""
+    return get_scheduler().call_bulk(url, func, *args, **kwargs)
@@ -42,3 +42,445 @@ def test_configs():
 
 
     return
+
+
+def test_match_cadastral():
+    # bulk matching must agree with the per-point lookup
+    from austriadownloader.download import (match_cadastral, get_intersecting_cadastral, transform_coordinates,
+                                            WGS84, AUSTRIA_CRS)
+    from shapely.geometry import Point
+
+    lon = numpy.array([15.9040047148, 0.0])
+    lat = numpy.array([47.6615683484712, 0.0])
+    matched = match_cadastral(lon, lat)
+
+    expected = get_intersecting_cadastral(Point(*transform_coordinates((lon[0], lat[0]), WGS84, AUSTRIA_CRS)))
+    assert matched[0] == expected.name
+    assert matched[1] == -1
+
+    return
+
+
+def test_transformer_cache():
+    from austriadownloader.download import (get_transformer, transform_coordinates, transform_coordinates_array,
+                                            WGS84, AUSTRIA_CRS)
+
+    assert get_transformer(WGS84, AUSTRIA_CRS) is get_transformer(WGS84, AUSTRIA_CRS)
+
+    x, y = transform_coordinates_array(numpy.array([15.9, 16.3]), numpy.array([47.6, 48.2]), WGS84, AUSTRIA_CRS)
+    assert numpy.allclose((x[1], y[1]), transform_coordinates((16.3, 48.2), WGS84, AUSTRIA_CRS))
+
+    return
+
+
+def test_morton_code():
+    from austriadownloader.downloadmanager import morton_code
+
+    # corners of a square follow the Z pattern: lower left, lower right, upper left, upper right
+    codes = morton_code(numpy.array([0.0, 1.0, 0.0, 1.0]), numpy.array([0.0, 0.0, 1.0, 1.0]))
+    assert list(numpy.argsort(codes)) == [0, 1, 2, 3]
+
+    return
+
+
+def test_gdal_profile():
+    import pytest
+
+    config = ConfigManager(**{'data_path': './tests/test_samples/demo_single.csv',
+                              'pixel_size': 1.6,
+                              'outpath': "./tests/tmp/rgb_single",
+                              'shape': [3, 512, 512],
+                              'mask_label': [41],
+                              'gdal_profile': 'throughput',
+                              'gdal_options': {'GDAL_CACHEMAX': 128}})
+    assert config.gdal_env['GDAL_CACHEMAX'] == 128
+    assert config.gdal_env['GDAL_HTTP_MULTIPLEX'] == 'YES'
+
+    with pytest.raises(ValueError):
+        ConfigManager(**{**config.config_data, 'gdal_profile': 'fastest'})
+
+    return
+
+
+def test_class_statistics():
+    from austriadownloader.download import class_statistics
+
+    mask = numpy.zeros((4, 5), dtype=numpy.uint8)
+    mask[1:3, 2:4] = 41
+
+    stats = class_statistics(mask, extended=True)
+    assert stats['histogram'][0] == 16 and stats['histogram'][41] == 4
+    assert stats['bboxes'][41] == (1, 2, 2, 3)
+    assert stats['bboxes'][0] == (0, 0, 3, 4)
+    assert stats['edge_pixels'][41] == 4 and stats['edge_pixels'][0] == 8
+
+    return
+
+
+def test_pipeline():
+    import threading
+    from austriadownloader.pipeline import Pipeline, Stage
+
+    seen = {}
+
+    def route(item):
+        # every key has to end up on a single worker
+        seen.setdefault(item % 3, set()).add(threading.get_ident())
+        return item
+
+    pipeline = Pipeline([Stage('double', lambda x: 2 * x, workers=4),
+                         Stage('route', route, workers=3, key=lambda x: x),
+                         Stage('inc', lambda x: x + 1, workers=2)], queue_size=2)
+    assert sorted(pipeline.run(range(100))) == [2 * i + 1 for i in range(100)]
+    assert all(len(threads) == 1 for threads in seen.values())
+
+    return
+
+
+def test_request_retry():
+    import pytest
+    from austriadownloader.scheduler import HostLimiter, RequestScheduler, is_transient
+
+    scheduler = RequestScheduler(max_retries=3, backoff=0.0, host_concurrency=4)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise IOError("HTTP response code: 503")
+        return 'data'
+
+    assert scheduler.call('https://data.bev.gv.at/tile.tif', flaky) == 'data'
+    assert len(attempts) == 3
+    assert scheduler.limiter('data.bev.gv.at').active == 0
+
+    # errors other than transient ones are not retried
+    def missing():
+        attempts.append(1)
+        raise IOError("HTTP response code: 404")
+
+    with pytest.raises(IOError):
+        scheduler.call('https://data.bev.gv.at/tile.tif', missing)
+    assert len(attempts) == 4
+
+    assert is_transient(IOError("OpenSSL SSL_read: Connection reset by peer, errno 104"))
+    assert not is_transient(IOError("SSL certificate problem: unable to get local issuer certificate"))
+
+    # neither a single slow request nor a lasting slowdown of the server pins the limit
+    limiter = HostLimiter(8)
+    for latency in [0.01] * 200 + [1.0] + [0.05] * 200:
+        limiter.acquire()
+        limiter.release(latency, False)
+    assert limiter.limit == 8 and limiter.latency > 0.04
+
+    # the worker processes of the parallel download method share the per-host limit
+    from austriadownloader.downloadmanager import configure_requests
+    from austriadownloader.scheduler import get_scheduler
+
+    config = ConfigManager(**{'data_path': './tests/test_samples/demo_single.csv',
+                              'pixel_size': 1.6,
+                              'outpath': "./tests/tmp/rgb_single",
+                              'shape': [3, 512, 512],
+                              'mask_label': [41],
+                              'host_concurrency': 16})
+    configure_requests(config, processes=4)
+    assert get_scheduler().host_concurrency == 4
+    configure_requests(config, processes=32)
+    assert get_scheduler().host_concurrency == 1
+    configure_requests(config)
+
+    return
+
+
+def test_stage_summary():
+    import pandas
+    from austriadownloader.downloadmanager import stage_summary
+    from austriadownloader.downloadstate import DownloadState
+
+    tile_state = DownloadState(id=1, lat=47.0, lon=15.0)
+    with tile_state.timed('raster_read'):
+        time.sleep(0.01)
+    assert tile_state.get_state()['time_raster_read'] >= 0.01
+
+    summary = stage_summary(pandas.DataFrame({'time_raster_read': numpy.arange(1, 101, dtype=float)}))
+    assert summary['raster_read']['p50'] == 50.5 and summary['raster_read']['total'] == 5050
+    assert 'resample' not in summary
+
+    return
+
+
+def test_resample_engines():
+    from austriadownloader.resampling import resample
+
+    rows, cols = numpy.mgrid[0:160, 0:160]
+    band = (127 + 100 * numpy.sin(cols / 7.0) * numpy.cos(rows / 11.0)).astype(numpy.uint8)
+    data = numpy.stack([band, band.T, numpy.flipud(band), numpy.fliplr(band)])
+
+    reference = resample(data, (128, 128), engine='pil')
+    assert reference.shape == (4, 128, 128) and reference.dtype == numpy.uint8
+
+    for engine in ('numpy', 'gdal'):
+        out = numpy.empty((4, 128, 128), dtype=numpy.uint8)
+        assert resample(data, (128, 128), engine=engine, out=out) is out
+        assert numpy.abs(out.astype(int) - reference).max() <= 1
+
+    return
+
+
+def test_read_overview():
+    import pytest
+
+    config = ConfigManager(**{'data_path': './tests/test_samples/demo_single.csv',
+                              'pixel_size': 0.2,
+                              'outpath': "./tests/tmp/rgb_single",
+                              'shape': [3, 512, 512],
+                              'mask_label': [41],
+                              'resample_size': 1.0,
+                              'resample_engine': 'gdal',
+                              'resampling': 'average'})
+    # read from the 0.8 overview instead of enlarging the 0.2 window fivefold
+    assert config.source_pixel_size == 0.8
+
+    with pytest.raises(ValueError):
+        ConfigManager(**{**config.config_data, 'resample_engine': 'pil'})
+    with pytest.raises(ValueError):
+        ConfigManager(**{**config.config_data, 'resampling': 'max'})
+
+    return
+
+
+def test_check_nodata():
+    from austriadownloader.download import check_nodata
+    from austriadownloader.downloadstate import DownloadState
+
+    data = numpy.full((3, 16, 16), 7, dtype=numpy.uint8)
+    data[0, :4, :4] = 0  # black in a single band only
+    state = DownloadState(id=1, lat=48.2, lon=16.4)
+    assert check_nodata(data, state, nodata_method='remove') is data
+    assert not state.ortho_contains_nodata
+
+    data[:, :2, :2] = 0
+    assert check_nodata(data, state, nodata_method='flag') is data
+    assert state.ortho_contains_nodata
+    assert check_nodata(data, state, nodata_method='remove') is None
+
+    return
+
+
+def test_window_nodata():
+    import rasterio
+    from austriadownloader.download import window_nodata, AUSTRIA_CRS
+    from austriadownloader.data import AUSTRIA_CADASTRAL
+
+    footprint = AUSTRIA_CADASTRAL.geometry.iloc[0]
+    inner, edge = footprint.representative_point(), footprint.boundary.interpolate(0.85, normalized=True)
+
+    # a 10 m grid covering the footprint, windows of 100 px centered on the points
+    left, bottom, right, top = footprint.bounds
+    transform = rasterio.Affine(10.0, 0.0, left, 0.0, -10.0, top)
+    shape = (int((top - bottom) / 10), int((right - left) / 10))
+    rows = (numpy.array([top - inner.y, top - inner.y, top - edge.y]) / 10).astype(int) - 50
+    cols = numpy.array([(inner.x - left) / 10, 0, (edge.x - left) / 10]).astype(int) - 50
+
+    nodata = window_nodata(rows, cols, numpy.zeros(3, dtype=int), (100, 100), transform, shape, AUSTRIA_CRS)
+    assert nodata.tolist() == [False, True, True]
+
+    return
+
+
+def test_cadastral_cache(tmp_path):
+    import pandas
+    from austriadownloader.data import get_cadastral_data, read_cache, write_cache
+
+    data = get_cadastral_data()
+    write_cache(data, tmp_path / 'cache.npz', (1, 2, 3))
+    assert read_cache(tmp_path / 'cache.npz', (1, 2, 4)) is None  # the GeoPackage changed
+
+    cached = read_cache(tmp_path / 'cache.npz', (1, 2, 3))
+    pandas.testing.assert_frame_equal(pandas.DataFrame(cached), pandas.DataFrame(data))
+    assert cached.crs == data.crs
+
+    # a corrupt cache counts as outdated
+    (tmp_path / 'cache.npz').write_bytes(b'PK\x03\x04 truncated')
+    assert read_cache(tmp_path / 'cache.npz', (1, 2, 3)) is None
+
+    return
+
+
+def test_profiled(monkeypatch, tmp_path):
+    import cProfile
+    import pytest
+    from austriadownloader.downloadmanager import profiled, dump_profiles
+
+    config = ConfigManager(**{'data_path': './tests/test_samples/demo_single.csv',
+                              'pixel_size': 1.6,
+                              'outpath': tmp_path,
+                              'shape': [3, 512, 512],
+                              'mask_label': [41],
+                              'profile_workers': True})
+    with profiled(config):
+        sum(range(1000))
+    dump_profiles(config)
+    assert list((tmp_path / 'profiles').glob('*.prof'))
+
+    # e.g. on Python 3.12+ with another profiler active, the work itself must not fail
+    def busy(self):
+        raise ValueError('Another profiling tool is already active')
+
+    monkeypatch.setattr(cProfile.Profile, 'enable', busy)
+    monkeypatch.setattr('austriadownloader.downloadmanager._PROFILES', {'pid': None, 'profilers': {}, 'active': 0,
+                                                                         'dumped': 0.0})
+    with pytest.warns(RuntimeWarning), profiled(config):
+        done = True
+    assert done
+
+    return
+
+
+def test_resume(tmp_path):
+    config = ConfigManager(**{'data_path': './tests/test_samples/demo_short.csv',
+                              'pixel_size': 1.6,
+                              'outpath': tmp_path,
+                              'shape': [3, 512, 512],
+                              'mask_label': [41]})
+    manager = DownloadManager(config=config)
+    first, second, third = manager.tiles['id'].astype(str).tolist()[:3]
+
+    manager.completion_index.open(append=False)
+    manager.state_log.open()
+    manager.add_row({'id': first, 'aerial': True, 'error': None})
+    manager.add_row({'id': second, 'aerial': False, 'error': 'HTTP response code: 404'})
+    manager.add_row({'id': second, 'aerial': True, 'error': None})  # logged again on retry
+    manager.add_row({'id': third, 'aerial': False, 'error': 'HTTP response code: 404'})
+    manager.completion_index.close()
+    manager.state_log.close()
+
+    # completions of another configuration and a partially written last line are ignored
+    with open(tmp_path / 'completed.csv', 'a') as f:
+        f.write(f"0123456789abcdef,{third}\n{config.config_hash},{third}")
+
+    resumed = DownloadManager(config=config)
+    assert resumed.completion_index.load() == {first, second}
+    resumed.skip_completed()
+    remaining = resumed.tiles['id'].astype(str).tolist()
+    assert first not in remaining and second not in remaining and third in remaining
+
+    # the state log keeps the last row per tile
+    state = resumed.state.set_index('id')
+    assert len(state) == 3 and bool(state.loc[int(second), 'aerial'])
+
+    return
+
+
+def test_resume_path_spelling(tmp_path):
+    def manager(data_path, outpath):
+        return DownloadManager(config=ConfigManager(**{'data_path': data_path,
+                                                       'pixel_size': 1.6,
+                                                       'outpath': outpath,
+                                                       'shape': [3, 512, 512],
+                                                       'mask_label': [41]}))
+
+    outpath = tmp_path / 'out'
+    outpath.mkdir()
+    first = manager('./tests/test_samples/demo_short.csv', os.path.relpath(outpath))
+    first.open_logs()
+    tile_id = first.tiles['id'].astype(str).tolist()[0]
+    first.add_row({'id': tile_id, 'aerial': True, 'error': None})
+    first.completion_index.close()
+    first.state_log.close()
+
+    # the same directories spelled as absolute paths resume the run and keep its state log
+    resumed = manager(os.path.abspath('./tests/test_samples/demo_short.csv'), outpath)
+    assert resumed.config.config_hash == first.config.config_hash
+    resumed.open_logs()
+    resumed.completion_index.close()
+    resumed.state_log.close()
+    assert tile_id not in resumed.tiles['id'].astype(str).tolist()
+    assert resumed.state['id'].astype(str).tolist() == [tile_id]
+
+    return
+
+
+def test_empty_mask_label():
+    from austriadownloader.download import read_parcels
+
+    config = ConfigManager(**{'data_path': './tests/test_samples/demo_single.csv',
+                              'pixel_size': 1.6,
+                              'outpath': "./tests/tmp/rgb_single",
+                              'shape': [3, 512, 512],
+                              'mask_label': []})
+    parcels = read_parcels('https://data.bev.gv.at/missing.gpkg', config, bbox=(0, 0, 1, 1))
+    assert parcels.empty and list(parcels.columns) == ['NS', 'geometry']
+
+    return
+
+
+def test_extract_cadastral(tmp_path, monkeypatch):
+    import geopandas
+    import pytest
+    import shapely
+    from austriadownloader.cadastralcache import CADASTRAL_LAYER, extract_cadastral, mirror_cadastral
+
+    # local GeoPackages are used in place
+    source = tmp_path / 'NFL.gpkg'
+    assert mirror_cadastral(str(source), tmp_path / 'cache') == source
+
+    # parcels along a row, stored out of spatial order
+    xs = [4, 0, 3, 1, 2, 5]
+    parcels = geopandas.GeoDataFrame({'NS': [40 + x for x in xs], 'KG': [str(x) for x in xs]},
+                                     geometry=[shapely.box(x * 10, 0, x * 10 + 8, 8) for x in xs], crs="EPSG:31287")
+    parcels.to_file(source, driver="GPKG", layer=CADASTRAL_LAYER)
+
+    extents = [(0, 0, 19, 8), (30, 0, 49, 8)]  # excludes the parcel at x=2 and x=5
+    extract = extract_cadastral(source, extents, tmp_path / 'cache')
+    extracted = geopandas.read_file(extract, layer=CADASTRAL_LAYER)
+    assert list(extracted.columns) == ['NS', 'geometry']
+    assert extracted['NS'].tolist() == [44, 40, 43, 41]  # feature order of the source
+
+    # a second call over the same extents reuses the extract
+    monkeypatch.setattr(geopandas, 'read_file', lambda *args, **kwargs: pytest.fail('extract was not reused'))
+    assert extract_cadastral(source, list(reversed(extents)), tmp_path / 'cache') == extract
+
+    return
+
+
+def test_query_parcels(tmp_path, monkeypatch):
+    import geopandas
+    import pytest
+    from geopandas.testing import assert_geodataframe_equal
+    import shapely
+    from austriadownloader.cadastralcache import CADASTRAL_LAYER
+    from austriadownloader.download import clear_parcels, prefetch_parcels, query_parcels, read_parcels
+
+    # a grid of parcels separated by gaps, stored in a shuffled order
+    cells = numpy.random.default_rng(0).permutation(100)
+    parcels = geopandas.GeoDataFrame({'NS': [(41, 42, 50)[c % 3] for c in cells]},
+                                     geometry=[shapely.box(c % 10 * 10 + 1, c // 10 * 10 + 1, c % 10 * 10 + 9,
+                                                           c // 10 * 10 + 9) for c in cells], crs="EPSG:31287")
+    source = str(tmp_path / 'NFL.gpkg')
+    parcels.to_file(source, driver="GPKG", layer=CADASTRAL_LAYER)
+
+    config = ConfigManager(**{'data_path': './tests/test_samples/demo_single.csv',
+                              'pixel_size': 1.6,
+                              'outpath': "./tests/tmp/rgb_single",
+                              'shape': [3, 512, 512],
+                              'mask_label': [41, 42]})
+    inside, outside = (20, 20, 70, 40), (0, 60, 40, 100)
+    expected_inside = read_parcels(source, config, bbox=inside)
+    expected_outside = read_parcels(source, config, bbox=outside)
+    assert len(expected_inside) and len(expected_outside) and set(expected_inside['NS']) == {41, 42}
+
+    prefetch_parcels(source, [(0, 0, 50, 50), (50, 0, 100, 50)], config)
+    try:
+        # answered from the prefetched parcels, in the order of the GeoPackage
+        with monkeypatch.context() as m:
+            m.setattr(geopandas, 'read_file', lambda *args, **kwargs: pytest.fail('parcels were read again'))
+            cached = query_parcels(source, inside, config)
+        assert_geodataframe_equal(cached.reset_index(drop=True), expected_inside)
+
+        # outside of the prefetched mask, the parcels are read directly
+        assert_geodataframe_equal(query_parcels(source, outside, config), expected_outside)
+    finally:
+        clear_parcels()
+
+    return